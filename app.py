@@ -1,8 +1,356 @@
-from flask import Flask, render_template, request
+import math
+import os
 
+import numpy as np
+import pandas as pd
+from flask import Flask, abort, jsonify, render_template, request, send_file
+
+from dataset import FEATURE_COLUMNS
+from features import get_feature_columns, get_fixture_features
+from model_registry import DEFAULT_MODEL_DIR, ModelRegistry
+from prediction_cache import DEFAULT_MAX_SIZE, DEFAULT_TTL, PredictionCache, hash_features
+from score_predictor import get_trained_model, load_data
+from team_registry import get_logo_path, get_team_id
+
+
+MODEL_NAME = os.environ.get('MODEL_NAME', 'gradient_boosting')
+MODEL_DIR = os.environ.get('MODEL_DIR', DEFAULT_MODEL_DIR)
+TEAM_DATA = os.environ.get('TEAM_DATA', 'TeamData.csv')
+CURRENT_SEASON_DATA = os.environ.get('CURRENT_SEASON_DATA', 'CurrentSeasonData.csv')
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', DEFAULT_MAX_SIZE))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', DEFAULT_TTL))
+EXTRA_FEATURES = os.environ.get('EXTRA_FEATURES', '0') == '1'
+
+# Feature columns of every fixture the model predicts, the scraped ones
+# and with EXTRA_FEATURES=1 also the ratings and form features
+FEATURES = get_feature_columns(EXTRA_FEATURES)
+
+# Name of every value of the Result column
+RESULT_NAMES = {0: 'Draw', 1: 'Home Win', 2: 'Away Win'}
+
+
+class InvalidRequest(Exception):
+    """Raised when the body of a request is not valid, it is answered with a 400"""
+
+
+def load_model(name=MODEL_NAME, model_dir=MODEL_DIR, train=True):
+    """Load the model used for the predictions
+
+    The latest stored version of the model is used when the registry has
+    one for the current feature schema, otherwise it is trained on the
+    scraped data and stored.
+
+    Args:
+        name: name of the model in score_predictor.MODELS
+        model_dir: directory of the model registry
+        train: train the model when the registry has none, otherwise None
+            is returned
+
+    Returns:
+        A (model, metadata) tuple
+    """
+
+    registry = ModelRegistry(model_dir)
+    stored = registry.load_latest(name)
+    if stored is None or stored[1]['features'] != FEATURES:
+        if not train:
+            return None
+        evidence, labels = load_data(TEAM_DATA, EXTRA_FEATURES)
+        get_trained_model(name, evidence, labels, registry, FEATURES)
+        stored = registry.load_latest(name)
+
+    model, metadata = stored
+    if not hasattr(model, 'predict_proba'):
+        raise ValueError(f"Model {name} can not predict probabilities")
+
+    return (model, metadata)
+
+
+def load_current_season(filename=CURRENT_SEASON_DATA):
+    """Load the fixtures of the next matchday
+
+    Args:
+        filename: csv file written by curr_season_webscraper
+
+    Returns:
+        A (matches, evidence, mtime) tuple with the name of every fixture,
+        the 2D array of its features and the modification time of the file,
+        the fixtures are empty and the time None if the file does not exist
+    """
+
+    mtime = get_mtime(filename)
+    if mtime is None:
+        return ([], np.empty((0, len(FEATURES))), None)
+
+    data = pd.read_csv(filename)
+    evidence = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    if EXTRA_FEATURES:
+        evidence = np.hstack([evidence, get_fixture_features(TEAM_DATA, data)])
+
+    return (data['Matches'].tolist(), evidence, mtime)
+
+
+def get_mtime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_feature_row(fixture):
+    """Validate the features of one fixture from a request
+
+    Args:
+        fixture: dictionary with a value for every column in FEATURES,
+            or a list of the values in the order of FEATURES
+
+    Returns:
+        The list of feature values as floats
+    """
+
+    if isinstance(fixture, dict):
+        missing = [column for column in FEATURES if column not in fixture]
+        if missing:
+            raise InvalidRequest(f"Missing features: {', '.join(missing)}")
+        values = [fixture[column] for column in FEATURES]
+    elif isinstance(fixture, list):
+        if len(fixture) != len(FEATURES):
+            raise InvalidRequest(f"Expected {len(FEATURES)} features, got {len(fixture)}")
+        values = fixture
+    else:
+        raise InvalidRequest("A fixture must be an object or a list of features")
+
+    row = []
+    for column, value in zip(FEATURES, values):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidRequest(f"Feature {column} must be a number")
+
+        # A JSON integer can be too large for a float
+        try:
+            value = float(value)
+        except OverflowError:
+            raise InvalidRequest(f"Feature {column} is too large")
+        if not math.isfinite(value):
+            raise InvalidRequest(f"Feature {column} must be a number")
+        row.append(value)
+
+    return row
+
+
+def get_fixture_id(fixture):
+    """Get the optional "id" of a fixture from a request as a string"""
+
+    if isinstance(fixture, dict) and fixture.get('id') is not None:
+        return str(fixture['id'])
+
+    return None
+
+
+def get_predictions(evidence, fixture_ids=None):
+    """Get the predictions of many fixtures from the cache or the model
+
+    Only the fixtures that are not cached are sent to the model, together
+    in a single predict_proba call. The cache key is the version of the
+    model, the id of the fixture and the hash of its features, and the
+    model is loaded again first if the registry changed.
+
+    Args:
+        evidence: 2D array with the features of every fixture
+        fixture_ids: id of every fixture, e.g. its name, or None
+
+    Returns:
+        The list of predictions in the format of predict_fixtures
+    """
+
+    refresh_model()
+    if fixture_ids is None:
+        fixture_ids = [None] * len(evidence)
+
+    keys = [(model_info['fingerprint'], fixture_id, hash_features(row))
+        for fixture_id, row in zip(fixture_ids, evidence)]
+    predictions = [prediction_cache.get(key) for key in keys]
+
+    missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+    if missing:
+        for index, prediction in zip(missing, predict_fixtures(evidence[missing])):
+            prediction_cache.put(keys[index], prediction)
+            predictions[index] = prediction
+
+    # The cached dictionaries are shared, so every response gets a copy
+    return [dict(prediction) for prediction in predictions]
+
+
+def predict_fixtures(evidence):
+    """Predict the result of every fixture with a single predict_proba call
+
+    Args:
+        evidence: 2D array with the features of every fixture
+
+    Returns:
+        A list with the predicted result and the probability of every
+        result for every fixture
+    """
+
+    if len(evidence) == 0:
+        return []
+
+    probabilities = model.predict_proba(evidence)
+    classes = [int(result) for result in model.classes_]
+    predictions = probabilities.argmax(axis=1)
+
+    return [{
+        'prediction': classes[index],
+        'result': RESULT_NAMES[classes[index]],
+        'probabilities': {RESULT_NAMES[result]: float(probability)
+            for result, probability in zip(classes, row)},
+    } for index, row in zip(predictions, probabilities)]
+
+
+def reload_model():
+    """Load the latest stored model and empty the cache if it changed
+
+    Only the metadata is read unless the fingerprint of the model changed.
+    The model is never trained here, the one that is loaded is kept when
+    the registry has no model for FEATURES.
+    """
+
+    global model, model_info, model_mtime
+
+    model_mtime = get_mtime(MODEL_DIR)
+    metadata = ModelRegistry(MODEL_DIR).get_metadata(MODEL_NAME)
+    if metadata is None or metadata['fingerprint'] == model_info['fingerprint'] \
+            or metadata['features'] != FEATURES:
+        return
+
+    stored = load_model(train=False)
+    if stored is not None:
+        model, model_info = stored
+        prediction_cache.clear()
+
+
+def refresh_model():
+    """Load the model again if the registry changed since it was loaded
+
+    Every save of a model, e.g. by online.py or score_predictor --save,
+    changes the modification time of the model directory. Saves of other
+    models only cost a read of the metadata.
+    """
+
+    if get_mtime(MODEL_DIR) != model_mtime:
+        reload_model()
+
+
+def refresh_current_season():
+    """Load CurrentSeasonData.csv again and empty the cache if it changed"""
+
+    global current_matches, current_evidence, current_mtime
+
+    if get_mtime(CURRENT_SEASON_DATA) != current_mtime:
+        current_matches, current_evidence, current_mtime = load_current_season()
+        prediction_cache.clear()
+
+
+# The model and the next matchday are loaded once when the app starts
+model, model_info = load_model()
+model_mtime = get_mtime(MODEL_DIR)
+current_matches, current_evidence, current_mtime = load_current_season()
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
 
 app = Flask(__name__)
 
+
+@app.errorhandler(InvalidRequest)
+def invalid_request(error):
+    return jsonify({'error': str(error)}), 400
+
+
 @app.route("/")
 def main():
     return render_template("scores.html")
+
+
+@app.route("/predict", methods=["POST"])
+def predict():
+    """Predict the result of a single fixture
+
+    The body is either {"features": {...}} or the features themselves,
+    see get_feature_row for the accepted formats, with an optional "id"
+    the prediction is cached under.
+    """
+
+    body = request.get_json(silent=True)
+    fixture_id = get_fixture_id(body)
+    if isinstance(body, dict) and 'features' in body:
+        body = body['features']
+
+    row = get_feature_row(body)
+
+    return jsonify(get_predictions(np.array([row]), [fixture_id])[0])
+
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Predict the result of many fixtures at once
+
+    The body is either {"fixtures": [...]} or the list of fixtures itself.
+    A fixture given as an object can have an "id" to cache it under.
+    """
+
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get('fixtures')
+    if not isinstance(body, list):
+        raise InvalidRequest("Expected a list of fixtures")
+
+    rows = []
+    fixture_ids = []
+    for index, fixture in enumerate(body):
+        try:
+            rows.append(get_feature_row(fixture))
+        except InvalidRequest as error:
+            raise InvalidRequest(f"Fixture {index}: {error}")
+        fixture_ids.append(get_fixture_id(fixture))
+
+    evidence = np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES))
+    return jsonify({'predictions': get_predictions(evidence, fixture_ids)})
+
+
+@app.route("/predict/matchday")
+def predict_matchday():
+    """Predict every fixture of the next matchday in CurrentSeasonData.csv"""
+
+    refresh_current_season()
+
+    predictions = get_predictions(current_evidence, current_matches)
+    for match, prediction in zip(current_matches, predictions):
+        prediction['match'] = match
+
+    return jsonify({'model': model_info['model'], 'predictions': predictions})
+
+
+@app.route("/logo/<team>")
+def logo(team):
+    """Get the club logo of a team by any name it appears under"""
+
+    path = get_logo_path(get_team_id(team))
+    if path is None:
+        abort(404)
+
+    return send_file(os.path.abspath(path))
+
+
+@app.route("/predict/cache")
+def prediction_cache_stats():
+    """Get the hit and miss counters of the prediction cache"""
+
+    return jsonify(prediction_cache.get_stats())
+
+
+@app.route("/reload", methods=["POST"])
+def reload():
+    """Load the latest model and next matchday without restarting the app"""
+
+    reload_model()
+    refresh_current_season()
+
+    return jsonify({'model': model_info['model'], 'fingerprint': model_info['fingerprint']})
@@ -0,0 +1,312 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import log_loss
+
+from dataset import get_season_from_match
+from score_predictor import MODELS, get_model, load_data
+
+
+DEFAULT_CACHE_DIR = '.backtest_cache'
+
+# Evidence and labels of a worker process, set once by _init_worker
+_evidence = None
+_labels = None
+
+
+def load_match_calendar(filename):
+    """Get the season and matchday of every row of the scraped data
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        A (seasons, matchdays) tuple of int arrays in the row order of the file
+    """
+
+    seasons = []
+    matchdays = []
+
+    with open(filename, newline='') as f:
+        for row in csv.DictReader(f):
+            seasons.append(get_season_from_match(row['Matches']))
+            matchdays.append(int(row['Matchday']))
+
+    return (np.array(seasons, dtype=np.int64), np.array(matchdays, dtype=np.int64))
+
+
+def get_walk_forward_folds(seasons, matchdays, window=None, min_train_seasons=1):
+    """Split the rows into folds that only train on the past
+
+    Every fold tests on a window of matchdays and trains on every row that
+    was played before it, so no future matchday leaks into training.
+
+    Args:
+        seasons: season of every row
+        matchdays: matchday of every row
+        window: number of matchdays tested per fold, None tests a whole
+            season per fold
+        min_train_seasons: number of seasons that are only used for training
+
+    Returns:
+        A list with a dictionary for every fold with the season, the first
+        and last matchday tested and the train and test row indices
+    """
+
+    # Rows are ordered by (season, matchday) with a single number
+    order = seasons * 1000 + matchdays
+    folds = []
+
+    for season in np.unique(seasons)[min_train_seasons:]:
+        season_matchdays = np.unique(matchdays[seasons == season])
+        step = window or len(season_matchdays)
+
+        for start in range(0, len(season_matchdays), step):
+            first, last = season_matchdays[start], season_matchdays[start:start + step][-1]
+            test = np.flatnonzero((seasons == season) & (matchdays >= first) & (matchdays <= last))
+            train = np.flatnonzero(order < season * 1000 + first)
+            folds.append({'season': int(season), 'first_matchday': int(first),
+                'last_matchday': int(last), 'train': train, 'test': test})
+
+    return folds
+
+
+def get_cached_folds(seasons, matchdays, window=None, min_train_seasons=1,
+                     cache_dir=DEFAULT_CACHE_DIR):
+    """Get the walk-forward folds from the cache or compute and cache them
+
+    The folds are stored in a .npz file keyed by a hash of the calendar of
+    the data and the fold options, so they are only computed again when
+    the scraped data changes.
+
+    Args:
+        seasons: season of every row
+        matchdays: matchday of every row
+        window: see get_walk_forward_folds
+        min_train_seasons: see get_walk_forward_folds
+        cache_dir: directory the folds are cached in
+
+    Returns:
+        The folds in the format of get_walk_forward_folds
+    """
+
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(seasons, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(matchdays, dtype=np.int64).tobytes())
+    digest.update(json.dumps([window, min_train_seasons]).encode())
+    path = os.path.join(cache_dir, digest.hexdigest()[:16] + '.npz')
+
+    try:
+        with np.load(path) as cached:
+            info, train, test = cached['info'], cached['train'], cached['test']
+    except (FileNotFoundError, ValueError, KeyError):
+        folds = get_walk_forward_folds(seasons, matchdays, window, min_train_seasons)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Every fold is stored as its info and the length of its indices
+        info = np.array([[fold['season'], fold['first_matchday'], fold['last_matchday'],
+            len(fold['train']), len(fold['test'])] for fold in folds],
+            dtype=np.int64).reshape(-1, 5)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, info=info,
+            train=np.concatenate([fold['train'] for fold in folds] or [[]]).astype(np.int64),
+            test=np.concatenate([fold['test'] for fold in folds] or [[]]).astype(np.int64))
+        os.replace(tmp_path, path)
+        return folds
+
+    train_ends = np.cumsum(info[:, 3])
+    test_ends = np.cumsum(info[:, 4])
+
+    return [{'season': int(season), 'first_matchday': int(first),
+        'last_matchday': int(last),
+        'train': train[train_end - num_train:train_end],
+        'test': test[test_end - num_test:test_end]}
+        for (season, first, last, num_train, num_test), train_end, test_end
+        in zip(info, train_ends, test_ends)]
+
+
+def run_fold(name, fold):
+    """Train a model on the past of a fold and score it on the fold
+
+    Args:
+        name: name of the model in score_predictor.MODELS
+        fold: one of the folds from get_walk_forward_folds
+
+    Returns:
+        A dictionary with the model, the fold, the accuracy, the log loss
+        (None if the model has no probabilities) and the fit and predict
+        time in seconds
+    """
+
+    X_train, y_train = _evidence[fold['train']], _labels[fold['train']]
+    X_test, y_test = _evidence[fold['test']], _labels[fold['test']]
+
+    start = time.perf_counter()
+    model = get_model(name).fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = model.predict(X_test)
+    loss = None
+    if hasattr(model, 'predict_proba'):
+        loss = float(log_loss(y_test, model.predict_proba(X_test), labels=model.classes_))
+    predict_time = time.perf_counter() - start
+
+    return {
+        'model': name,
+        'season': fold['season'],
+        'first_matchday': fold['first_matchday'],
+        'last_matchday': fold['last_matchday'],
+        'train_rows': len(y_train),
+        'test_rows': len(y_test),
+        'accuracy': float(np.mean(predictions == y_test)),
+        'log_loss': loss,
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+
+def backtest(evidence, labels, folds, models=None, workers=None):
+    """Run every model on every fold in a pool of worker processes
+
+    Args:
+        evidence: 2D array of evidence
+        labels: array of labels
+        folds: the folds from get_walk_forward_folds
+        models: names of the models to run, defaults to every model in MODELS
+        workers: number of folds run at the same time, 1 runs them one
+            after another in this process
+
+    Returns:
+        The result of run_fold for every model and fold, by model and then
+        in the order of the folds
+    """
+
+    models = list(models or MODELS)
+    tasks = [(name, fold) for name in models for fold in folds]
+    evidence, labels = np.asarray(evidence), np.asarray(labels)
+
+    if not tasks:
+        return []
+    if workers == 1:
+        _init_worker(evidence, labels)
+        return [run_fold(name, fold) for name, fold in tasks]
+
+    # The data is sent to every worker once instead of with every fold
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+            initargs=(evidence, labels)) as pool:
+        return list(pool.map(run_fold, *zip(*tasks)))
+
+
+def summarize(results):
+    """Combine the fold results of every model per season
+
+    Args:
+        results: the list returned by backtest
+
+    Returns:
+        A list with a dictionary for every model and season with the
+        accuracy and log loss weighted by the rows of every fold and the
+        total fit and predict time
+    """
+
+    summary = {}
+    for result in results:
+        key = (result['model'], result['season'])
+        if key not in summary:
+            summary[key] = {'model': result['model'], 'season': result['season'],
+                'folds': 0, 'test_rows': 0, 'accuracy': 0.0, 'log_loss': 0.0,
+                'fit_time': 0.0, 'predict_time': 0.0}
+        season = summary[key]
+        season['folds'] += 1
+        season['test_rows'] += result['test_rows']
+        season['accuracy'] += result['accuracy'] * result['test_rows']
+        if result['log_loss'] is None or season['log_loss'] is None:
+            season['log_loss'] = None
+        else:
+            season['log_loss'] += result['log_loss'] * result['test_rows']
+        season['fit_time'] += result['fit_time']
+        season['predict_time'] += result['predict_time']
+
+    for season in summary.values():
+        season['accuracy'] /= season['test_rows']
+        if season['log_loss'] is not None:
+            season['log_loss'] /= season['test_rows']
+
+    return list(summary.values())
+
+
+def print_report(summary):
+    """Print the accuracy, log loss and timings of every model per season"""
+
+    print(f"{'Model':<25}{'Season':>9}{'Accuracy':>10}{'Log loss':>10}"
+        f"{'Fit (s)':>10}{'Predict (s)':>13}")
+    for season in summary:
+        loss = '-' if season['log_loss'] is None else f"{season['log_loss']:.3f}"
+        name = f"{season['season'] % 100:02}/{(season['season'] + 1) % 100:02}"
+        print(f"{MODELS[season['model']][0]:<25}{name:>9}"
+            f"{season['accuracy']*100:>9.1f}%{loss:>10}"
+            f"{season['fit_time']:>10.3f}{season['predict_time']:>13.3f}")
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the backtest
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the match result models")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file with the webscraped data")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS),
+        help="models to backtest, defaults to every model")
+    parser.add_argument("--window", type=int, default=None,
+        help="number of matchdays predicted per fold, defaults to a whole season")
+    parser.add_argument("--min-train-seasons", type=int, default=1,
+        help="number of seasons that are only used for training")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+        help="number of folds run at the same time")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+        help="directory the fold indices are cached in")
+    parser.add_argument("--output",
+        help="json file the per fold results and the summary are written to")
+    parser.add_argument("--extra-features", action="store_true",
+        help="also use the Elo ratings and the form features")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    evidence, labels = load_data(args.data, args.extra_features)
+    seasons, matchdays = load_match_calendar(args.data)
+    folds = get_cached_folds(seasons, matchdays, args.window,
+        args.min_train_seasons, args.cache_dir)
+
+    results = backtest(evidence, labels, folds, args.models, args.workers)
+    summary = summarize(results)
+    print_report(summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'folds': results, 'summary': summary}, f, indent=2)
+
+
+def _init_worker(evidence, labels):
+    global _evidence, _labels
+    _evidence, _labels = evidence, labels
+
+
+if __name__ == "__main__":
+    main()
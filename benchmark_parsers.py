@@ -0,0 +1,444 @@
+import argparse
+import csv
+import dataclasses
+import html
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from dataset import get_season_from_match, get_teams_from_match
+from fetch_planner import get_club_table_url, get_fixture_url
+from page_cache import DEFAULT_CACHE_DIR, PageCache
+from page_model import (AWAY_TEAM_CLASS, CLUB_NAME_CLASS, HOME_TEAM_CLASS,
+    MARKET_VALUE_CLASS, MATCH_RESULT_CLASS)
+from page_parser import CLUB_TABLE_REGION, FIXTURES_REGION, get_default_parser, parse_page
+from webscraper import (get_club_data, get_fixture_list, get_fixture_text,
+    get_match_results, get_matchday_page)
+
+
+BENCHMARK_DIR = 'benchmarks'
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, 'corpus')
+GOLDEN_FILE = os.path.join(BENCHMARK_DIR, 'golden.json')
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# The corpus in the repo is synthetic, see write_synthetic_corpus, run with
+# --snapshot to replace it with the real pages from a page cache
+
+# Seasons and matchdays saved in the corpus, 2020 is the season with 42
+# matchdays and 21 teams
+CORPUS_SEASONS = [2005, 2012, 2019, 2020]
+CORPUS_MATCHDAYS = [1, 17, 34]
+CORPUS_EXTRA_MATCHDAYS = {2020: [42]}
+
+# Goals of a fixture when they can not be worked out from the data, for
+# every value of the Result column
+RESULT_GOALS = {0: (1, 1), 1: (1, 0), 2: (0, 1)}
+
+# Number of navigation links around the tables of a synthetic page, the
+# real pages have a few hundred elements the parsers skip over
+NAVIGATION_LINKS = 150
+
+# A function counts as slower than the baseline when its throughput drops
+# by more than this fraction
+DEFAULT_TOLERANCE = 0.2
+
+
+def get_corpus_pages(seasons=CORPUS_SEASONS):
+    """Get the pages that make up the benchmark corpus
+
+    Args:
+        seasons: starting years of the seasons in the corpus
+
+    Returns:
+        A list with the file name and the link of every page
+    """
+
+    pages = []
+    for season in seasons:
+        pages.append((f'club_table-{season}.html', get_club_table_url(season)))
+        for matchday in CORPUS_MATCHDAYS + CORPUS_EXTRA_MATCHDAYS.get(season, []):
+            pages.append((f'fixtures-{season}-{matchday:02}.html',
+                get_fixture_url(season, matchday)))
+
+    return pages
+
+
+def snapshot_corpus(cache, corpus_dir=CORPUS_DIR, seasons=CORPUS_SEASONS):
+    """Save the pages of the corpus from the page cache
+
+    Args:
+        cache: the PageCache the pages are read from
+        corpus_dir: directory the pages are saved in
+        seasons: starting years of the seasons in the corpus
+    """
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    for filename, url in get_corpus_pages(seasons):
+        with open(os.path.join(corpus_dir, filename), 'wb') as f:
+            f.write(cache.fetch(url))
+
+
+def write_synthetic_corpus(team_data, corpus_dir=CORPUS_DIR, seasons=CORPUS_SEASONS):
+    """Write the corpus from the scraped data when the real pages are not at hand
+
+    Every page has the clubs, fixtures and results of its season and
+    matchday from the csv file, in the markup the parsers read and with a
+    block of navigation around it. The goals of a fixture are worked out
+    from the cumulative goals of both teams, the last match of a team in a
+    season only gets a score that matches its result. The pages measure
+    the parsers on the real number of clubs and fixtures, not on the real
+    markup of transfermarkt.
+
+    Args:
+        team_data: csv file with the webscraped data
+        corpus_dir: directory the pages are saved in
+        seasons: starting years of the seasons in the corpus
+    """
+
+    with open(team_data, newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    for season in seasons:
+        season_rows = [row for row in rows if get_season_from_match(row['Matches']) == season]
+
+        clubs = {}
+        for row in season_rows:
+            for side, team in zip(('Home', 'Away'), get_teams_from_match(row['Matches'])):
+                clubs.setdefault(team, [row[side + column] for column in
+                    ('SquadSize', 'AvgAge', 'NumForeigners', 'AvgMarketVal', 'MarketVal')])
+        _write_page(os.path.join(corpus_dir, f'club_table-{season}.html'),
+            _get_club_table_html(clubs))
+
+        goals = _get_match_goals(season_rows)
+        for matchday in CORPUS_MATCHDAYS + CORPUS_EXTRA_MATCHDAYS.get(season, []):
+            fixtures = [(get_teams_from_match(row['Matches']), goals[index])
+                for index, row in enumerate(season_rows) if int(row['Matchday']) == matchday]
+            _write_page(os.path.join(corpus_dir, f'fixtures-{season}-{matchday:02}.html'),
+                _get_fixtures_html(fixtures))
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """Load the saved pages of the corpus
+
+    Returns:
+        A dictionary with the 'fixtures' and 'club_table' pages, both a list
+        of (file name, content) tuples sorted by file name, or None if the
+        corpus directory does not exist
+    """
+
+    if not os.path.isdir(corpus_dir):
+        return None
+
+    corpus = {'fixtures': [], 'club_table': []}
+    for filename in sorted(os.listdir(corpus_dir)):
+        kind = filename.split('-')[0]
+        if kind in corpus:
+            with open(os.path.join(corpus_dir, filename), 'rb') as f:
+                corpus[kind].append((filename, f.read()))
+
+    return corpus
+
+
+def get_benchmark_inputs(corpus, parser):
+    """Parse the corpus into the input of every benchmarked function
+
+    Parsing is done up front so every get_* function is timed on its own.
+
+    Returns:
+        A dictionary with the kind of input as the key and a list of
+        (file name, input) tuples as the value
+    """
+
+    fixture_soups = [(name, parse_page(content, FIXTURES_REGION, parser))
+        for name, content in corpus['fixtures']]
+
+    return {
+        'fixture_html': corpus['fixtures'],
+        'club_table_html': corpus['club_table'],
+        'fixture_soup': fixture_soups,
+        'fixture_lists': [(name, get_fixture_list(soup)) for name, soup in fixture_soups],
+        'club_table_soup': [(name, parse_page(content, CLUB_TABLE_REGION, parser))
+            for name, content in corpus['club_table']],
+    }
+
+
+# Every benchmark with the kind of input it runs on and how it is called
+# with one page of that input, parse_page is checked by the number of
+# elements it built. get_matchday_page walks a fixture page once into the
+# MatchdayPage the scraper builds its rows from, the accessors walk it again
+# when they are given a soup.
+BENCHMARKS = {
+    'parse_page': ('fixture_html',
+        lambda content, parser: len(parse_page(content, FIXTURES_REGION, parser).find_all(True))),
+    'parse_page_club_table': ('club_table_html',
+        lambda content, parser: len(parse_page(content, CLUB_TABLE_REGION, parser).find_all(True))),
+    'get_matchday_page': ('fixture_soup',
+        lambda soup, parser: dataclasses.asdict(get_matchday_page(soup))),
+    'get_fixture_list': ('fixture_soup', lambda soup, parser: get_fixture_list(soup)),
+    'get_match_results': ('fixture_soup', lambda soup, parser: get_match_results(soup)),
+    'get_fixture_text': ('fixture_lists',
+        lambda lists, parser: get_fixture_text(*lists)),
+    'get_club_data': ('club_table_soup', lambda soup, parser: get_club_data(soup)),
+}
+
+
+def run_benchmark(name, inputs, parser, repeat=5):
+    """Time one function on every page of its input
+
+    Args:
+        name: name of the benchmark in BENCHMARKS
+        inputs: the dictionary from get_benchmark_inputs
+        parser: name of the BeautifulSoup parser backend
+        repeat: number of timed rounds over the pages, the fastest counts
+
+    Returns:
+        A dictionary with the number of pages, the pages per second and the
+        peak memory of one round in KiB, and the output of every page
+    """
+
+    kind, function = BENCHMARKS[name]
+    pages = inputs[kind]
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, page in pages:
+            function(page, parser)
+        best = min(best, time.perf_counter() - start)
+
+    # Memory is measured in a separate round since tracing slows it down
+    tracemalloc.start()
+    outputs = {filename: function(page, parser) for filename, page in pages}
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'pages': len(pages),
+        'pages_per_second': len(pages) / best if best else float('inf'),
+        'peak_kib': peak / 1024,
+        'outputs': json.loads(json.dumps(outputs)),
+    }
+
+
+def check_golden(results, golden):
+    """Compare the output of every benchmark with the golden outputs
+
+    Returns:
+        A list with a message for every page whose output changed or that
+        has no golden output, run with --update-golden to add new pages
+    """
+
+    failures = []
+    for name, result in results.items():
+        for filename, output in result['outputs'].items():
+            if filename not in golden.get(name, {}):
+                failures.append(f"{name} has no golden output for {filename}")
+            elif golden[name][filename] != output:
+                failures.append(f"{name} changed its output for {filename}")
+
+    return failures
+
+
+def compare_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare the throughput of every benchmark with the baseline
+
+    Returns:
+        A list with a message for every benchmark that got slower than the
+        tolerance allows
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['pages_per_second']
+        if result['pages_per_second'] < before * (1 - tolerance):
+            regressions.append(f"{name} dropped from {before:.1f} to "
+                f"{result['pages_per_second']:.1f} pages/s")
+
+    return regressions
+
+
+def print_report(results, baseline):
+    """Print the throughput and memory of every benchmark"""
+
+    print(f"{'Function':<24}{'Pages':>7}{'Pages/s':>12}{'Peak KiB':>11}{'Baseline':>12}")
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('pages_per_second')
+        change = '' if not before else \
+            f"{(result['pages_per_second'] / before - 1) * 100:+.0f}%"
+        print(f"{name:<24}{result['pages']:>7}{result['pages_per_second']:>12.1f}"
+            f"{result['peak_kib']:>11.1f}{change:>12}")
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the parser benchmarks
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Benchmark the transfermarkt page parsers")
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR,
+        help="directory with the saved pages")
+    parser.add_argument("--snapshot", action="store_true",
+        help="save the corpus from the page cache before benchmarking")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+        help="page cache the corpus is saved from")
+    parser.add_argument("--synthetic",
+        help="write a synthetic corpus from this csv file with the webscraped data "
+        "before benchmarking, when there is no page cache")
+    parser.add_argument("--parser", default=get_default_parser(),
+        help="BeautifulSoup parser backend")
+    parser.add_argument("--repeat", type=int, default=5,
+        help="number of timed rounds over the corpus")
+    parser.add_argument("--golden", default=GOLDEN_FILE,
+        help="json file with the expected output of every function")
+    parser.add_argument("--update-golden", action="store_true",
+        help="store the current outputs as the golden outputs")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+        help="json file with the throughput of every parser backend the results are compared with")
+    parser.add_argument("--save-baseline", action="store_true",
+        help="store the current throughput as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help="fraction of the baseline throughput a function may lose")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.snapshot:
+        snapshot_corpus(PageCache(args.cache_dir, offline=True), args.corpus_dir)
+    elif args.synthetic:
+        write_synthetic_corpus(args.synthetic, args.corpus_dir)
+
+    corpus = load_corpus(args.corpus_dir)
+    if corpus is None:
+        print(f"No corpus in {args.corpus_dir}, save one from the page cache with "
+            "--snapshot --cache-dir <page cache>")
+        return 1
+
+    inputs = get_benchmark_inputs(corpus, args.parser)
+    results = {name: run_benchmark(name, inputs, args.parser, args.repeat)
+        for name in BENCHMARKS}
+
+    # Throughput is only comparable with a baseline of the same parser backend
+    golden = _load_json(args.golden)
+    baselines = _load_json(args.baseline)
+    baseline = baselines.get(args.parser, {})
+    print_report(results, baseline)
+
+    if args.update_golden:
+        _save_json(args.golden, {name: result['outputs'] for name, result in results.items()})
+    if args.save_baseline:
+        baselines[args.parser] = {name: {key: result[key] for key in
+            ('pages', 'pages_per_second', 'peak_kib')} for name, result in results.items()}
+        _save_json(args.baseline, baselines)
+
+    failures = []
+    if not args.update_golden:
+        failures += check_golden(results, golden)
+    if not args.save_baseline:
+        failures += compare_baseline(results, baseline, args.tolerance)
+    for failure in failures:
+        print(failure)
+
+    return 1 if failures else 0
+
+
+def _get_match_goals(season_rows):
+    # The goals of a match are the difference between the cumulative goals
+    # of a team before it and before its next match
+    goals = [RESULT_GOALS[int(row['Result'])] for row in season_rows]
+    last_match = {}
+
+    for index, row in enumerate(season_rows):
+        for side, team in zip(('Home', 'Away'), get_teams_from_match(row['Matches'])):
+            if team in last_match:
+                previous, previous_side = last_match[team]
+                before = season_rows[previous]
+                scored = int(row[side + 'GoalsScored']) - int(before[previous_side + 'GoalsScored'])
+                conceded = int(row[side + 'GoalsConceded']) - \
+                    int(before[previous_side + 'GoalsConceded'])
+                score = (scored, conceded) if previous_side == 'Home' else (conceded, scored)
+                result = 0 if score[0] == score[1] else 1 if score[0] > score[1] else 2
+                if min(score) >= 0 and result == int(before['Result']):
+                    goals[previous] = score
+            last_match[team] = (index, side)
+
+    return goals
+
+
+def _get_fixtures_html(fixtures):
+    rows = []
+    for (home, away), (home_goals, away_goals) in fixtures:
+        rows.append(f'<tr class="begegnungZeile">'
+            f'<td class="{HOME_TEAM_CLASS}"><a class="vereinprofil_tooltip" href="#">'
+            f'{html.escape(home)}</a></td>'
+            f'<td class="zentriert hauptlink"><a href="#"><span class="{MATCH_RESULT_CLASS}">'
+            f'{home_goals}:{away_goals}</span></a></td>'
+            f'<td class="{AWAY_TEAM_CLASS}"><a class="vereinprofil_tooltip" href="#">'
+            f'{html.escape(away)}</a></td></tr>\n')
+
+    return _get_page_html(f'<div class="responsive-table"><table><tbody>\n{"".join(rows)}'
+        f'</tbody></table></div>')
+
+
+def _get_club_table_html(clubs):
+    rows = []
+    for index, (name, (squad_size, age, foreigners, average, total)) in enumerate(clubs.items()):
+        average = int(average)
+        average_text = f'€{average / 1000:.2f}m' if average >= 1000 else f'€{average}Th.'
+        rows.append(f'<tr class="{"odd" if index % 2 == 0 else "even"}">'
+            f'<td class="zentriert"><img src="#" alt=""></td>'
+            f'<td class="{CLUB_NAME_CLASS}"><a href="#">{html.escape(name)}</a></td>'
+            f'<td class="zentriert">{squad_size}</td><td class="zentriert">{age}</td>'
+            f'<td class="zentriert">{foreigners}</td>'
+            f'<td class="{MARKET_VALUE_CLASS}">{average_text}</td>'
+            f'<td class="{MARKET_VALUE_CLASS}">€{int(total) / 1000:.2f}m</td></tr>\n')
+
+    return _get_page_html(f'<table class="items"><thead><tr><th>Club</th></tr></thead>'
+        f'<tbody>\n{"".join(rows)}</tbody></table>')
+
+
+def _get_page_html(content):
+    links = ''.join(f'<li><a href="/link/{index}">Link {index}</a></li>'
+        for index in range(NAVIGATION_LINKS))
+
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Super Lig</title>'
+        f'<script>var page = {{}};</script></head><body>\n'
+        f'<!-- Synthetic page written by benchmark_parsers.py --synthetic -->\n'
+        f'<header><nav><ul>{links}</ul></nav></header>\n'
+        f'<div class="box"><table><tr><td>Matchday</td></tr></table>\n{content}</div>\n'
+        f'<footer><ul>{links}</ul></footer></body></html>\n')
+
+
+def _write_page(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _load_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+
+TEAM_DATA_COLUMNS = [
+    'Matchday', 'Matches',
+    'HomePositions', 'AwayPositions',
+    'HomeWins', 'AwayWins',
+    'HomeDraws', 'AwayDraws',
+    'HomeLosses', 'AwayLosses',
+    'HomeGoalsScored', 'AwayGoalsScored',
+    'HomeGoalsConceded', 'AwayGoalsConceded',
+    'HomeGoalDiff', 'AwayGoalDiff',
+    'HomePoints', 'AwayPoints',
+    'HomeSquadSize', 'AwaySquadSize',
+    'HomeAvgAge', 'AwayAvgAge',
+    'HomeNumForeigners', 'AwayNumForeigners',
+    'HomeAvgMarketVal', 'AwayAvgMarketVal',
+    'HomeMarketVal', 'AwayMarketVal',
+    'Result',
+]
+CURRENT_SEASON_COLUMNS = TEAM_DATA_COLUMNS[:-1]
+FEATURE_COLUMNS = TEAM_DATA_COLUMNS[:1] + TEAM_DATA_COLUMNS[2:-1]
+LABEL_COLUMN = 'Result'
+
+# The Home and Away columns that come from the standings
+STANDINGS_FEATURE_COLUMNS = TEAM_DATA_COLUMNS[2:18]
+
+# One row of the dataset with its values in the order of TEAM_DATA_COLUMNS,
+# fixtures that have not been played yet have no Result
+FixtureRow = namedtuple('FixtureRow', TEAM_DATA_COLUMNS, defaults=[None])
+
+COLUMN_INDEX = {column: index for index, column in enumerate(TEAM_DATA_COLUMNS)}
+FEATURE_INDICES = [COLUMN_INDEX[column] for column in FEATURE_COLUMNS]
+LABEL_INDEX = COLUMN_INDEX[LABEL_COLUMN]
+
+# Number of rows the scraper buffers before writing them to its output
+DEFAULT_BUFFER_ROWS = 1000
+
+# Number of rows read from the csv file at a time when the columnar files
+# are built from it
+COLUMNAR_CHUNK_ROWS = 4096
+
+
+def get_season_from_match(match):
+    """Get the starting year of the season from the Matches column
+
+    Args:
+        match: value of the Matches column, e.g. '05/06 - Home vs. Away'
+
+    Returns:
+        The starting year of the season, e.g. 2005
+    """
+
+    return 2000 + int(match[:2])
+
+
+def get_teams_from_match(match):
+    """Get the home and away team from the Matches column
+
+    Args:
+        match: value of the Matches column, e.g. '05/06 - Home vs. Away'
+
+    Returns:
+        A (home team, away team) tuple
+    """
+
+    home, away = match.split(' - ', 1)[1].split(' vs. ')
+
+    return (home, away)
+
+
+def get_scraped_matchdays(filename):
+    """Get every (season, matchday) pair that is already in a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        A set with a (season, matchday) tuple for every matchday in the file
+        up to its checkpoint
+    """
+
+    if not os.path.exists(filename):
+        return set()
+
+    # Rows after the checkpoint belong to a block that was cut off
+    with open(filename, 'rb') as f:
+        content = f.read(_get_committed_size(filename))
+
+    return {(get_season_from_match(row['Matches']), int(row['Matchday']))
+        for row in csv.DictReader(io.StringIO(content.decode('utf-8'), newline=''))}
+
+
+class CsvAppender:
+    """Append rows to a csv file so every written block survives a crash
+
+    The file is created with the given columns if it does not exist yet,
+    otherwise rows are written in the order of the header already in the
+    file. The unnamed index columns pandas writes are filled with the row
+    number like pandas.DataFrame.to_csv would.
+
+    Blocks of rows are kept in a bounded buffer and written together once
+    it holds buffer_rows rows, so memory does not grow with the run. After
+    every write the size of the file is stored in a checkpoint next to it,
+    which is replaced in one step. A crash in the middle of a write leaves
+    rows after the checkpoint, they are cut off when the file is opened
+    again so only whole blocks are kept.
+
+    Args:
+        filename: filename of the csv file
+        columns: columns of the rows when the file is created
+        overwrite: start a new file even if one already exists
+        buffer_rows: number of rows buffered before they are written, 0
+            writes every block right away
+        columnar: also stream the evidence and labels into the columnar
+            .npy files, they are finished when the appender is closed
+    """
+
+    def __init__(self, filename, columns, overwrite=False, buffer_rows=0,
+                 columnar=False):
+        self.filename = filename
+        self.buffer_rows = buffer_rows
+        self._buffer = []
+        self._buffered_rows = 0
+
+        if overwrite or not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            self.header = [''] + list(columns)
+            self.num_rows = 0
+            text = io.StringIO()
+            csv.writer(text, lineterminator='\n').writerow(self.header)
+            with open(filename, 'w', newline='') as f:
+                f.write(text.getvalue())
+                f.flush()
+                os.fsync(f.fileno())
+                _save_checkpoint(filename, os.fstat(f.fileno()).st_size, text.getvalue())
+        else:
+            _remove_uncommitted_rows(filename)
+            with open(filename, newline='') as f:
+                reader = csv.reader(f)
+                self.header = next(reader)
+                self.num_rows = sum(1 for _ in reader)
+
+        missing = [c for c in columns if c not in self.header]
+        if missing:
+            raise ValueError(f"{filename} has no column for {', '.join(missing)}")
+
+        # Position of every column of the file in a FixtureRow, None for
+        # the index columns
+        unknown = [c for c in self.header if c not in COLUMN_INDEX and not _is_index_column(c)]
+        if unknown:
+            raise ValueError(f"{filename} has columns that are not in a row: {', '.join(unknown)}")
+        self._positions = [None if _is_index_column(c) else COLUMN_INDEX[c]
+            for c in self.header]
+
+        # The existing rows are copied into the columnar files first
+        self.columnar = ColumnarAppender(filename, seed=not overwrite) if columnar else None
+
+    def append(self, rows):
+        """Add a block of rows, it is written once the buffer is full
+
+        Args:
+            rows: list of FixtureRow
+        """
+
+        text = io.StringIO()
+        writer = csv.writer(text, lineterminator='\n')
+        for row in rows:
+            writer.writerow([self.num_rows if position is None else row[position]
+                for position in self._positions])
+            self.num_rows += 1
+
+        self._buffer.append(text.getvalue())
+        self._buffered_rows += len(rows)
+        if self.columnar is not None:
+            self.columnar.append(rows)
+
+        if self._buffered_rows >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered blocks and make sure they reach the disk"""
+
+        if self._buffer:
+            text = ''.join(self._buffer)
+            with open(self.filename, 'a', newline='') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+                _save_checkpoint(self.filename, os.fstat(f.fileno()).st_size,
+                    text[text.rstrip('\n').rfind('\n') + 1:])
+            self._buffer = []
+            self._buffered_rows = 0
+
+        if self.columnar is not None:
+            self.columnar.flush()
+
+    def close(self):
+        """Write what is left in the buffer and finish the columnar files"""
+
+        self.flush()
+        if self.columnar is not None:
+            self.columnar.close()
+            self.columnar = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ColumnarAppender:
+    """Stream the evidence and labels of the rows into the columnar files
+
+    The values are appended to raw part files next to the .npy files, so
+    only the current buffer is kept in memory. Closing the appender turns
+    the parts into the .npy files and writes the schema, which stamps them
+    with the size and modification time the csv file has at that moment.
+
+    Args:
+        filename: filename of the csv file the columnar files belong to
+        seed: start with the rows that are already in the csv file
+    """
+
+    def __init__(self, filename, seed=False):
+        self.filename = filename
+        self.num_rows = 0
+        self._evidence = []
+        self._labels = []
+
+        features_path, labels_path, _ = get_columnar_paths(filename)
+        self._features_part = open(features_path + '.part', 'wb')
+        self._labels_part = open(labels_path + '.part', 'wb')
+
+        if seed and os.path.exists(filename):
+            with open(filename, newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                feature_indices = [header.index(column) for column in FEATURE_COLUMNS]
+                label_index = header.index(LABEL_COLUMN)
+                for row in reader:
+                    self._add_row(row, feature_indices, label_index)
+                    if len(self._labels) >= COLUMNAR_CHUNK_ROWS:
+                        self.flush()
+
+    def append(self, rows):
+        """Add the evidence and label of every row
+
+        Args:
+            rows: list of FixtureRow
+        """
+
+        for row in rows:
+            self._add_row(row, FEATURE_INDICES, LABEL_INDEX)
+
+    def flush(self):
+        """Write the buffered values to the part files"""
+
+        if self._labels:
+            self._features_part.write(
+                np.array(self._evidence, dtype=np.float64).tobytes())
+            self._labels_part.write(np.array(self._labels, dtype=np.int64).tobytes())
+            self.num_rows += len(self._labels)
+            self._evidence = []
+            self._labels = []
+
+    def close(self):
+        """Turn the part files into the .npy files and write the schema
+
+        Returns:
+            The number of rows that were written
+        """
+
+        self.flush()
+        self._features_part.close()
+        self._labels_part.close()
+
+        features_path, labels_path, schema_path = get_columnar_paths(self.filename)
+        _finish_npy(features_path, np.float64, (self.num_rows, len(FEATURE_COLUMNS)))
+        _finish_npy(labels_path, np.int64, (self.num_rows,))
+
+        # The schema is written last, the files are only used when it exists
+        stat = os.stat(self.filename)
+        schema = {
+            'features': FEATURE_COLUMNS,
+            'label': LABEL_COLUMN,
+            'rows': self.num_rows,
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+        }
+        tmp_path = schema_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(schema, f, indent=2)
+        os.replace(tmp_path, schema_path)
+
+        return self.num_rows
+
+    def _add_row(self, row, feature_indices, label_index):
+        self._evidence.append([float(row[index]) for index in feature_indices])
+        self._labels.append(int(row[label_index]))
+
+
+def get_columnar_paths(filename):
+    """Get the paths of the columnar files that belong to a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        The paths of the feature matrix, the label vector and the schema
+    """
+
+    base = os.path.splitext(filename)[0]
+
+    return base + '.features.npy', base + '.labels.npy', base + '.schema.json'
+
+
+def write_columnar_dataset(filename):
+    """Write the evidence and labels of a csv file as .npy files
+
+    The feature matrix and the label vector are stored as contiguous .npy
+    files next to the csv file together with a json schema that records
+    the columns and the csv file they were built from. The csv file is
+    streamed in chunks so memory does not grow with its size.
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        The number of rows that were written
+    """
+
+    return ColumnarAppender(filename, seed=True).close()
+
+
+def load_columnar_dataset(filename):
+    """Memory-map the columnar files that belong to a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        The feature matrix and the label vector as read-only memory-mapped
+        arrays, or None if the files are missing, have a different schema
+        or are older than the csv file
+    """
+
+    features_path, labels_path, schema_path = get_columnar_paths(filename)
+    try:
+        with open(schema_path) as f:
+            schema = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if schema.get('features') != FEATURE_COLUMNS or schema.get('label') != LABEL_COLUMN:
+        return None
+    if os.path.exists(filename):
+        stat = os.stat(filename)
+        if (stat.st_size, stat.st_mtime_ns) != (schema['source_size'], schema['source_mtime_ns']):
+            return None
+
+    try:
+        evidence = np.load(features_path, mmap_mode='r')
+        labels = np.load(labels_path, mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if len(evidence) != schema['rows'] or len(labels) != schema['rows']:
+        return None
+
+    return evidence, labels
+
+
+def _is_index_column(column):
+    # The unnamed index columns pandas writes in front of the data
+    return column == '' or column.startswith('Unnamed:')
+
+
+def _finish_npy(path, dtype, shape):
+    # Put the .npy header in front of the raw values of the part file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            'fortran_order': False,
+            'shape': shape,
+        })
+        with open(path + '.part', 'rb') as part:
+            shutil.copyfileobj(part, f, 1 << 20)
+    os.replace(tmp_path, path)
+    os.remove(path + '.part')
+
+
+def _get_checkpoint_path(filename):
+    return os.path.splitext(filename)[0] + '.checkpoint.json'
+
+
+def _get_committed_size(filename):
+    # Size of the csv file after the last whole block, None if there is no
+    # checkpoint or it belongs to a file that was replaced since
+    try:
+        with open(_get_checkpoint_path(filename)) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    size = checkpoint['size']
+    last_line = checkpoint['last_line'].encode('utf-8')
+    with open(filename, 'rb') as f:
+        f.seek(max(size - len(last_line), 0))
+        if size < len(last_line) or f.read(len(last_line)) != last_line:
+            return None
+
+    return size
+
+
+def _save_checkpoint(filename, size, last_line):
+    path = _get_checkpoint_path(filename)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'size': size, 'last_line': last_line}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def _remove_uncommitted_rows(filename):
+    # Rows after the checkpoint are from a block that a crash cut off. A
+    # file without a checkpoint was written in one go, e.g. by pandas, so
+    # it is taken as it is from here on
+    size = _get_committed_size(filename)
+    if size is None:
+        with open(filename, 'rb') as f:
+            lines = f.read().splitlines(keepends=True)
+        _save_checkpoint(filename, sum(len(line) for line in lines),
+            lines[-1].decode('utf-8'))
+    elif os.path.getsize(filename) > size:
+        os.truncate(filename, size)
+
+
+if __name__ == "__main__":
+    for filename in sys.argv[1:] or ["TeamData.csv"]:
+        num_rows = write_columnar_dataset(filename)
+        print(f"Wrote {num_rows} rows of {filename} to {get_columnar_paths(filename)[0]}")
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dataset import FEATURE_COLUMNS, LABEL_COLUMN, get_teams_from_match
+from ratings import RATING_COLUMNS, get_pre_match_ratings, load_ratings
+
+
+DEFAULT_CACHE_DIR = '.feature_cache'
+
+# Number of earlier matches the form features are averaged over
+FORM_WINDOW = 5
+
+FORM_COLUMNS = [
+    'HomeFormPoints', 'AwayFormPoints',
+    'HomeFormGoalsFor', 'AwayFormGoalsFor',
+    'HomeFormGoalsAgainst', 'AwayFormGoalsAgainst',
+    'HomeHomeFormPoints', 'AwayAwayFormPoints',
+    'H2HHomePoints', 'H2HAwayPoints', 'H2HMeetings',
+]
+EXTRA_FEATURE_COLUMNS = RATING_COLUMNS + FORM_COLUMNS
+
+# Cumulative goal columns the goals of every match are worked out from
+GOAL_COLUMNS = ['HomeGoalsScored', 'AwayGoalsScored', 'HomeGoalsConceded', 'AwayGoalsConceded']
+
+# Points of the home and away team for every value of the Result column
+HOME_POINTS = {0: 1, 1: 3, 2: 0}
+AWAY_POINTS = {0: 1, 1: 0, 2: 3}
+
+
+def get_feature_columns(extra_features=False):
+    """Get the feature schema the models are trained and predict with
+
+    Args:
+        extra_features: add the ratings and form features to the scraped ones
+
+    Returns:
+        The list of feature columns
+    """
+
+    if extra_features:
+        return FEATURE_COLUMNS + EXTRA_FEATURE_COLUMNS
+
+    return FEATURE_COLUMNS
+
+
+def build_form_features(data, window=FORM_WINDOW):
+    """Work out the form and head-to-head features of every row
+
+    Every feature only looks at matches before the row, in the order of the
+    rows. Rows without a Result count as not played yet, their features
+    are the form after the last played match of the team. The goals of a
+    match are the difference between the cumulative goals of a team before
+    the match and before its next match of the season, so the last match
+    of a season has no goals and is left out of the goal form.
+
+    Args:
+        data: DataFrame with the Matches and Result columns and the
+            GOAL_COLUMNS in match order
+        window: number of earlier matches the features are averaged over
+
+    Returns:
+        A DataFrame with the FORM_COLUMNS of every row, 0 where a team has
+        no earlier matches
+    """
+
+    num_rows = len(data)
+    teams = [get_teams_from_match(match) for match in data['Matches']]
+    home = pd.Series([fixture[0] for fixture in teams], dtype=object)
+    away = pd.Series([fixture[1] for fixture in teams], dtype=object)
+    seasons = data['Matches'].str[:2].astype(int).to_numpy()
+    results = pd.to_numeric(data[LABEL_COLUMN], errors='coerce').to_numpy() \
+        if LABEL_COLUMN in data else np.full(num_rows, np.nan)
+    home_points = pd.Series(results).map(HOME_POINTS).to_numpy(dtype=np.float64)
+    away_points = pd.Series(results).map(AWAY_POINTS).to_numpy(dtype=np.float64)
+
+    # Every match once for the home team and once for the away team, in
+    # match order
+    matches = pd.DataFrame({
+        'row': np.tile(np.arange(num_rows), 2),
+        'team': pd.concat([home, away], ignore_index=True),
+        'season': np.tile(seasons, 2),
+        'is_home': np.repeat([True, False], num_rows),
+        'points': np.concatenate([home_points, away_points]),
+    }).sort_values('row', kind='stable')
+
+    missing = [column for column in GOAL_COLUMNS if column not in data]
+    if missing:
+        warnings.warn(f"No {', '.join(missing)} columns, the goal form is left at 0")
+        matches['goals_for'] = np.nan
+        matches['goals_against'] = np.nan
+    else:
+        for column, side in (('goals_for', 'Scored'), ('goals_against', 'Conceded')):
+            before = pd.Series(np.concatenate([data[f'HomeGoals{side}'].to_numpy(),
+                data[f'AwayGoals{side}'].to_numpy()]), dtype=np.float64).loc[matches.index]
+            after = before.groupby([matches['team'], matches['season']], sort=False).shift(-1)
+            matches[column] = (after - before).where(matches['points'].notna())
+
+    # The features of a team are moved back to the row of their match
+    features = pd.DataFrame(index=range(num_rows), columns=FORM_COLUMNS, dtype=np.float64)
+    forms = {column: _get_pre_match_mean(matches, value, matches['team'], window)
+        for column, value in (('FormPoints', 'points'), ('FormGoalsFor', 'goals_for'),
+                              ('FormGoalsAgainst', 'goals_against'))}
+    for side, is_home in (('Home', True), ('Away', False)):
+        rows = matches['row'][matches['is_home'] == is_home]
+        for column, form in forms.items():
+            features[side + column] = form[rows.index].set_axis(rows)
+
+        # Home form only counts home matches and away form only away matches
+        venue = matches.loc[rows.index]
+        form = _get_pre_match_mean(venue, 'points', venue['team'], window)
+        features[f'{side}{side}FormPoints'] = form.set_axis(rows)
+
+    # Head-to-head is kept from the side of the first team of the pair by
+    # name, so both venues of a meeting count
+    first_is_home = (home < away).to_numpy()
+    pairs = pd.DataFrame({
+        'pair': np.where(first_is_home, home + '|' + away, away + '|' + home),
+        'first_points': np.where(first_is_home, home_points, away_points),
+        'second_points': np.where(first_is_home, away_points, home_points),
+    })
+    first = _get_pre_match_mean(pairs, 'first_points', pairs['pair'], window)
+    second = _get_pre_match_mean(pairs, 'second_points', pairs['pair'], window)
+    features['H2HHomePoints'] = np.where(first_is_home, first, second)
+    features['H2HAwayPoints'] = np.where(first_is_home, second, first)
+    features['H2HMeetings'] = _get_pre_match_mean(pairs, 'first_points', pairs['pair'],
+        window, 'count')
+
+    return features.fillna(0)
+
+
+def get_cached_form_features(filename, window=FORM_WINDOW, cache_dir=DEFAULT_CACHE_DIR):
+    """Get the form features of every row of a csv file from the cache
+
+    The features are stored in a .npz file keyed by a hash of the csv file
+    and the feature options, so they are only worked out again when the
+    scraped data changes.
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+        window: see build_form_features
+        cache_dir: directory the features are cached in
+
+    Returns:
+        A 2D array with the FORM_COLUMNS of every row
+    """
+
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps([FORM_COLUMNS, window]).encode())
+    path = os.path.join(cache_dir, digest.hexdigest()[:16] + '.npz')
+
+    try:
+        with np.load(path) as cached:
+            return cached['features']
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    features = build_form_features(pd.read_csv(filename), window).to_numpy(dtype=np.float64)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, features=features)
+    os.replace(tmp_path, path)
+
+    return features
+
+
+def load_features(filename, cache_dir=DEFAULT_CACHE_DIR):
+    """Get the EXTRA_FEATURE_COLUMNS of every row of a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+        cache_dir: directory the form features are cached in
+
+    Returns:
+        A 2D array with the ratings and form features of every row
+    """
+
+    return np.hstack([load_ratings(filename),
+        get_cached_form_features(filename, cache_dir=cache_dir)])
+
+
+def get_fixture_features(filename, fixtures):
+    """Get the EXTRA_FEATURE_COLUMNS of fixtures that have not been played yet
+
+    Args:
+        filename: filename of the csv file with the webscraped data the
+            features are built from
+        fixtures: DataFrame with the fixtures in the format of
+            CurrentSeasonData.csv, in match order
+
+    Returns:
+        A 2D array with the ratings and form features of every fixture
+    """
+
+    if len(fixtures) == 0:
+        return np.empty((0, len(EXTRA_FEATURE_COLUMNS)))
+
+    history = pd.read_csv(filename)
+    fixtures = fixtures.assign(**{LABEL_COLUMN: np.nan})
+    form = build_form_features(pd.concat([history, fixtures], ignore_index=True))
+
+    return np.hstack([get_pre_match_ratings(filename, fixtures['Matches']),
+        form.tail(len(fixtures)).to_numpy(dtype=np.float64)])
+
+
+def _get_pre_match_mean(frame, column, keys, window, how='mean'):
+    # Rolling mean over the last window played matches of every group, as
+    # it was before every row of the frame
+    played = frame[column].notna()
+    rolling = frame[column][played].groupby(keys[played], sort=False).rolling(window, min_periods=1)
+    after = getattr(rolling, how)().droplevel(0).reindex(frame.index)
+
+    before = after.groupby(keys, sort=False).shift(1)
+    return before.groupby(keys, sort=False).ffill()
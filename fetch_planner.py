@@ -0,0 +1,88 @@
+FIXTURE_URL = 'https://www.transfermarkt.com/super-lig/spieltagtabelle/wettbewerb/TR1?saison_id='
+CLUB_TABLE_URL = 'https://www.transfermarkt.com/super-lig/startseite/wettbewerb/TR1/saison_id/'
+CLUB_TABLE = 'club_table'
+
+
+def get_fixture_url(season, matchday):
+    """Get the link of the fixture page for the given season and matchday"""
+
+    return FIXTURE_URL + str(season) + '&spieltag=' + str(matchday)
+
+
+def get_club_table_url(season):
+    """Get the link of the club table page for the given season"""
+
+    return CLUB_TABLE_URL + str(season)
+
+
+def get_season_matchdays(season):
+    """Get the matchdays played in the given season
+
+    The 2020/2021 season was played with 21 teams so it had 42 matchdays
+    instead of the usual 34, and from 2021/2022 on the league has 38.
+
+    Args:
+        season: starting year of the season
+
+    Returns:
+        The range of matchdays in the season
+    """
+
+    upper_matchday = 35
+    if season == 2020:
+        upper_matchday = 43
+    elif season > 2020:
+        upper_matchday = 39
+
+    return range(1, upper_matchday)
+
+
+def plan_season_pages(season, matchdays):
+    """Build the set of unique pages needed to scrape a season
+
+    The club table does not change within a season so it is only needed
+    once. The standings before a matchday are built from the results of
+    every earlier matchday, so their pages are part of the plan as well.
+
+    Args:
+        season: starting year of the season
+        matchdays: the matchdays we want to scrape in the season
+
+    Returns:
+        A dictionary with CLUB_TABLE or the matchday number as the key and
+        the link of the page as the value
+    """
+
+    plan = {CLUB_TABLE: get_club_table_url(season)}
+
+    for matchday in range(1, max(matchdays, default=0) + 1):
+        plan[matchday] = get_fixture_url(season, matchday)
+
+    return plan
+
+
+def fetch_planned_pages(plan, fetcher, matchdays=None):
+    """Start downloading every page in the plan exactly once
+
+    The pages are downloaded concurrently in the background so the caller
+    can start working on a page as soon as it arrives. Matchdays that are
+    only in the plan for their results have already been played, so their
+    pages are taken from the cache without asking the server again.
+
+    Args:
+        plan: the dictionary returned by plan_season_pages
+        fetcher: the PageFetcher the pages are downloaded with
+        matchdays: the matchdays we want to scrape, None if every page in
+            the plan should be revalidated
+
+    Returns:
+        A dictionary with the same keys as the plan and a Future that
+        resolves to the raw content of each page as the value
+    """
+
+    pages = {}
+    for key, url in plan.items():
+        revalidate = matchdays is None or key == CLUB_TABLE or key in matchdays
+        pages[key] = fetcher.submit(url, revalidate=revalidate)
+
+    return pages
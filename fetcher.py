@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from page_cache import USER_AGENT
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_DELAY = 0.25
+
+
+class HostBudget:
+    """Politeness budget for a single host
+
+    Limits how many requests run against the host at the same time and
+    how close together two requests to the host may start.
+
+    Args:
+        max_concurrent: number of requests allowed in flight at once
+        delay: minimum number of seconds between two request starts
+    """
+
+    def __init__(self, max_concurrent, delay):
+        self.delay = delay
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.delay
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
+
+
+class PageFetcher:
+    """Concurrent page downloader shared by the webscrapers
+
+    Pages are downloaded on a thread pool through a single pooled
+    requests.Session so connections are kept alive between requests.
+    Every download goes through the page cache first and only the
+    requests that actually reach the network are charged against the
+    politeness budget of their host.
+
+    Args:
+        cache: the PageCache the pages are fetched through
+        max_workers: number of pages downloaded at the same time
+        per_host: number of requests allowed in flight per host
+        delay: minimum number of seconds between two requests to a host
+        report: optional RunReport that gets the fetch stage of every page
+            and the download stage of every request that reached the network
+    """
+
+    def __init__(self, cache, max_workers=DEFAULT_WORKERS,
+                 per_host=DEFAULT_PER_HOST, delay=DEFAULT_DELAY, report=None):
+        self.cache = cache
+        self.per_host = per_host
+        self.delay = delay
+        self.report = report
+
+        self.session = requests.Session()
+        self.session.headers['User-agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._budgets = {}
+        self._budgets_lock = threading.Lock()
+
+    def fetch(self, url, revalidate=True):
+        """Download a single page and block until it is done
+
+        Args:
+            url: link of the page
+            revalidate: ask the server again when the cached copy is stale
+
+        Returns:
+            The raw content of the page in bytes
+        """
+
+        if self.report is None:
+            return self.cache.fetch(url, session=_PoliteSession(self),
+                revalidate=revalidate)
+
+        with self.report.stage('fetch'):
+            return self.cache.fetch(url, session=_PoliteSession(self),
+                revalidate=revalidate)
+
+    def submit(self, url, revalidate=True):
+        """Start downloading a page in the background
+
+        Args:
+            url: link of the page
+            revalidate: ask the server again when the cached copy is stale
+
+        Returns:
+            A Future that resolves to the raw content of the page
+        """
+
+        return self._executor.submit(self.fetch, url, revalidate)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _budget(self, url):
+        host = urlsplit(url).netloc
+        with self._budgets_lock:
+            if host not in self._budgets:
+                self._budgets[host] = HostBudget(self.per_host, self.delay)
+            return self._budgets[host]
+
+
+class _PoliteSession:
+    # Handed to the page cache so only real network requests wait for the
+    # politeness budget, cache hits never do
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    def get(self, url, **kwargs):
+        with self.fetcher._budget(url):
+            if self.fetcher.report is None:
+                return self.fetcher.session.get(url, **kwargs)
+            with self.fetcher.report.stage('download'):
+                return self.fetcher.session.get(url, **kwargs)
@@ -0,0 +1,199 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import sklearn
+
+from dataset import FEATURE_COLUMNS, LABEL_COLUMN
+
+
+DEFAULT_MODEL_DIR = 'models'
+
+
+def get_dataset_fingerprint(evidence, labels, columns=FEATURE_COLUMNS):
+    """Hash the training data of a model
+
+    The evidence is hashed as float64 and the labels as int64, so the same
+    data gives the same fingerprint whether it comes from the csv file, the
+    columnar copy or a pandas DataFrame.
+
+    Args:
+        evidence: 2D array of evidence
+        labels: array of labels
+        columns: names of the feature columns of the evidence
+
+    Returns:
+        The sha256 of the data and its schema in hex
+    """
+
+    evidence = np.ascontiguousarray(evidence, dtype=np.float64)
+    labels = np.ascontiguousarray(labels, dtype=np.int64)
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(columns), LABEL_COLUMN, evidence.shape]).encode())
+    digest.update(evidence.tobytes())
+    digest.update(labels.tobytes())
+
+    return digest.hexdigest()
+
+
+def get_model_fingerprint(name, estimator, data_fingerprint):
+    """Hash everything a trained model depends on
+
+    Args:
+        name: name of the model, e.g. 'gradient_boosting'
+        estimator: the unfitted estimator, its hyperparameters are hashed
+        data_fingerprint: fingerprint of the training data
+
+    Returns:
+        The sha256 of the model name, hyperparameters, training data and
+        scikit-learn version in hex
+    """
+
+    params = estimator.get_params(deep=True)
+    key = json.dumps({
+        'model': name,
+        'params': {param: repr(value) for param, value in sorted(params.items())},
+        'data': data_fingerprint,
+        'sklearn': sklearn.__version__,
+    }, sort_keys=True)
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ModelRegistry:
+    """Trained models stored on disk next to what they were trained on
+
+    Every model is stored as <name>-<fingerprint>.joblib together with a
+    json file with its metadata. The fingerprint covers the training data,
+    the feature schema and the hyperparameters, so a stored model is only
+    reused when none of them changed. Only the latest version of every
+    model is kept.
+
+    Args:
+        model_dir: directory the models are stored in
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR):
+        self.model_dir = model_dir
+
+    def get_or_train(self, name, estimator, evidence, labels, columns=FEATURE_COLUMNS):
+        """Get the stored model or train it if it is missing or stale
+
+        Args:
+            name: name of the model
+            estimator: the unfitted estimator, it is fitted when the model
+                has to be trained
+            evidence: 2D array of evidence to train on
+            labels: array of labels to train on
+            columns: names of the feature columns of the evidence
+
+        Returns:
+            The fitted model
+        """
+
+        data_fingerprint = get_dataset_fingerprint(evidence, labels, columns)
+        fingerprint = get_model_fingerprint(name, estimator, data_fingerprint)
+
+        model = self.load(name, fingerprint)
+        if model is not None:
+            return model
+
+        # Always fit on plain arrays so the model does not depend on whether
+        # the data came from a DataFrame
+        start = time.perf_counter()
+        model = estimator.fit(np.asarray(evidence, dtype=np.float64), np.asarray(labels))
+        self.save(name, model, fingerprint, {
+            'data_fingerprint': data_fingerprint,
+            'features': list(columns),
+            'rows': len(labels),
+            'fit_time': time.perf_counter() - start,
+        })
+
+        return model
+
+    def load(self, name, fingerprint):
+        """Load the stored model with the given fingerprint
+
+        Returns:
+            The fitted model, or None if it is not stored
+        """
+
+        try:
+            return joblib.load(self._model_path(name, fingerprint))
+        except FileNotFoundError:
+            return None
+
+    def load_latest(self, name):
+        """Load the latest stored version of a model without the training data
+
+        Args:
+            name: name of the model
+
+        Returns:
+            A (model, metadata) tuple, or None if the model was never stored
+        """
+
+        metadata = self.get_metadata(name)
+        if metadata is None:
+            return None
+
+        model = self.load(name, metadata['fingerprint'])
+        if model is None:
+            return None
+
+        return (model, metadata)
+
+    def get_metadata(self, name):
+        """Get the metadata of the latest stored version of a model"""
+
+        latest = None
+        for path in glob.glob(os.path.join(self.model_dir, glob.escape(name) + '-*.json')):
+            with open(path) as f:
+                metadata = json.load(f)
+            if metadata['model'] == name and (latest is None
+                    or metadata['trained_at'] > latest['trained_at']):
+                latest = metadata
+
+        return latest
+
+    def save(self, name, model, fingerprint, metadata=None):
+        """Store a fitted model and remove its older versions
+
+        Args:
+            name: name of the model
+            model: the fitted model
+            fingerprint: fingerprint from get_model_fingerprint
+            metadata: extra information stored in the json file, its
+                'features' default to FEATURE_COLUMNS
+        """
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        model_path = self._model_path(name, fingerprint)
+
+        # Write to a temporary file first so a crash never leaves half a model
+        tmp_path = model_path + '.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+
+        metadata = dict({'features': FEATURE_COLUMNS}, **(metadata or {}))
+        metadata.update(model=name, fingerprint=fingerprint, label=LABEL_COLUMN,
+            sklearn=sklearn.__version__, trained_at=time.time())
+        metadata_path = self._metadata_path(name, fingerprint)
+        with open(metadata_path + '.tmp', 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(metadata_path + '.tmp', metadata_path)
+
+        for path in glob.glob(os.path.join(self.model_dir, glob.escape(name) + '-*')):
+            if path not in (model_path, metadata_path) and not path.endswith('.tmp'):
+                os.remove(path)
+
+    def _model_path(self, name, fingerprint):
+        return os.path.join(self.model_dir, f'{name}-{fingerprint[:16]}.joblib')
+
+    def _metadata_path(self, name, fingerprint):
+        return os.path.join(self.model_dir, f'{name}-{fingerprint[:16]}.json')
@@ -0,0 +1,248 @@
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.pipeline import Pipeline
+
+from features import get_feature_columns
+from model_registry import (DEFAULT_MODEL_DIR, ModelRegistry, get_dataset_fingerprint,
+    get_model_fingerprint)
+from score_predictor import MODELS, get_model, load_data
+
+
+# Number of updates after which a model is refitted on all of the data
+DEFAULT_REFIT_EVERY = 10
+
+# How much more accurate a full refit may be on the new rows before the
+# updated model is thrown away and refitted, judged once the check has seen
+# a few matchdays since a single one is too noisy
+DEFAULT_MAX_DRIFT = 0.05
+DRIFT_MIN_ROWS = 45
+
+# Boosted models get this many trees per update, fitted on the latest rows
+WARM_START_ESTIMATORS = 5
+WARM_START_ROWS = 500
+
+
+def get_final_estimator(model):
+    """Get the estimator at the end of a pipeline, or the model itself"""
+
+    return model[-1] if isinstance(model, Pipeline) else model
+
+
+def supports_online(model):
+    """Check if a model can be updated without fitting it from scratch
+
+    Models with partial_fit, like naive bayes and the SGD models, and
+    gradient boosting, which can add trees to a fitted model, can.
+    """
+
+    estimator = get_final_estimator(model)
+    return hasattr(estimator, 'partial_fit') or isinstance(estimator, GradientBoostingClassifier)
+
+
+# Every model in MODELS that update_model can update
+ONLINE_MODELS = [name for name, (_, estimator) in MODELS.items() if supports_online(estimator)]
+
+
+def partial_fit_model(model, evidence, labels, start):
+    """Fold the rows from start onwards into a fitted model
+
+    The steps of a pipeline before the estimator keep what they learned at
+    the last full fit, only the estimator is updated.
+
+    Args:
+        model: the fitted model
+        evidence: 2D array with all of the evidence
+        labels: array with all of the labels
+        start: index of the first row the model has not seen
+
+    Returns:
+        The updated model, or None if it can not be updated with these rows
+    """
+
+    estimator = get_final_estimator(model)
+    if isinstance(estimator, GradientBoostingClassifier):
+        # New trees are fitted on the latest rows and need every class in them
+        start = max(0, len(labels) - WARM_START_ROWS)
+        if set(np.unique(labels[start:])) != set(estimator.classes_):
+            return None
+
+    evidence = evidence[start:]
+    if isinstance(model, Pipeline):
+        evidence = model[:-1].transform(evidence)
+
+    if isinstance(estimator, GradientBoostingClassifier):
+        estimator.set_params(warm_start=True,
+            n_estimators=len(estimator.estimators_) + WARM_START_ESTIMATORS)
+        estimator.fit(evidence, labels[start:])
+    else:
+        estimator.partial_fit(evidence, labels[start:])
+
+    return model
+
+
+def check_update(name, model, evidence, labels, start):
+    """Score the model and a full refit on the rows the model has not seen
+
+    Args:
+        name: name of the model in score_predictor.MODELS
+        model: the fitted model before the update
+        evidence: 2D array with all of the evidence
+        labels: array with all of the labels
+        start: index of the first row the model has not seen
+
+    Returns:
+        A dictionary with the number of rows and how many of them the model
+        and a model refitted on the rows before start got right
+    """
+
+    refit = get_model(name).fit(evidence[:start], labels[:start])
+    new_evidence, new_labels = evidence[start:], labels[start:]
+
+    return {
+        'rows': len(new_labels),
+        'online_correct': int(np.sum(model.predict(new_evidence) == new_labels)),
+        'refit_correct': int(np.sum(refit.predict(new_evidence) == new_labels)),
+    }
+
+
+def update_model(name, evidence, labels, registry=None, columns=None,
+                 refit_every=DEFAULT_REFIT_EVERY, check=False, max_drift=DEFAULT_MAX_DRIFT):
+    """Bring the stored model up to date with the rows added since it was trained
+
+    The rows are taken to be appended to the end of the data. The latest
+    stored model is updated with the new rows when it was trained on the
+    rows before them, otherwise it is refitted on all of the data. A full
+    refit is also done every refit_every updates, and with check when a
+    refit does better on the new rows than the updated model by more than
+    max_drift since the last refit, once DRIFT_MIN_ROWS rows were checked.
+    The check is skipped while the stored model is still a full refit.
+
+    Args:
+        name: name of the model in ONLINE_MODELS
+        evidence: 2D array with all of the evidence
+        labels: array with all of the labels
+        registry: the ModelRegistry to use, defaults to the models directory
+        columns: names of the feature columns of the evidence
+        refit_every: number of updates between two full refits
+        check: compare the updated model with a full refit on the new rows
+            before folding them in
+        max_drift: accuracy a refit may have over the updated model
+
+    Returns:
+        A dictionary with the model, what was done ('unchanged', 'update' or
+        'refit'), the number of new rows, the time it took in seconds, the
+        number of updates since the last refit and the drift, the rows and
+        correct predictions of the check since the last refit
+    """
+
+    registry = registry or ModelRegistry()
+    columns = columns or get_feature_columns()
+    evidence = np.asarray(evidence, dtype=np.float64)
+    labels = np.asarray(labels)
+
+    stored = registry.load_latest(name)
+    model, metadata = stored if stored is not None else (None, {})
+    start = metadata.get('rows', 0)
+
+    # The stored model can only be updated if it was trained on exactly
+    # the rows before the new ones
+    reusable = model is not None and metadata.get('features') == columns and \
+        start <= len(labels) and metadata.get('data_fingerprint') == \
+        get_dataset_fingerprint(evidence[:start], labels[:start], columns)
+
+    drift = dict(metadata.get('drift', {'rows': 0, 'online_correct': 0, 'refit_correct': 0}))
+    if reusable and start == len(labels):
+        return {'model': model, 'mode': 'unchanged', 'rows': 0, 'time': 0.0,
+            'updates': metadata.get('updates', 0), 'drift': drift}
+
+    # A model with no updates since its last refit was fitted on exactly the
+    # rows a refit would use, so comparing the two can only ever agree
+    if reusable and check and metadata.get('updates', 0) > 0:
+        for key, value in check_update(name, model, evidence, labels, start).items():
+            drift[key] += value
+
+    updates = metadata.get('updates', 0) + 1
+    drifted = drift['rows'] >= DRIFT_MIN_ROWS and \
+        (drift['refit_correct'] - drift['online_correct']) / drift['rows'] > max_drift
+    refit = not reusable or updates >= refit_every or drifted
+
+    began = time.perf_counter()
+    if not refit:
+        model = partial_fit_model(model, evidence, labels, start)
+        refit = model is None
+
+    if refit:
+        model = registry.get_or_train(name, get_model(name), evidence, labels, columns)
+        return {'model': model, 'mode': 'refit', 'rows': len(labels) - start,
+            'time': time.perf_counter() - began, 'updates': 0, 'drift': drift}
+
+    update_time = time.perf_counter() - began
+    data_fingerprint = get_dataset_fingerprint(evidence, labels, columns)
+    registry.save(name, model, get_model_fingerprint(name + '+online', get_model(name),
+        data_fingerprint), {
+        'data_fingerprint': data_fingerprint,
+        'features': list(columns),
+        'rows': len(labels),
+        'fit_time': update_time,
+        'updates': updates,
+        'drift': drift,
+    })
+
+    return {'model': model, 'mode': 'update', 'rows': len(labels) - start,
+        'time': update_time, 'updates': updates, 'drift': drift}
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the online updates
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Update the stored models with the new matchdays")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file with the webscraped data")
+    parser.add_argument("--models", nargs="+", choices=ONLINE_MODELS, default=ONLINE_MODELS,
+        help="models to update, defaults to every model that can be updated")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR,
+        help="directory the trained models are stored in")
+    parser.add_argument("--refit-every", type=int, default=DEFAULT_REFIT_EVERY,
+        help="number of updates between two full refits")
+    parser.add_argument("--check", action="store_true",
+        help="compare every update with a full refit on the new rows")
+    parser.add_argument("--max-drift", type=float, default=DEFAULT_MAX_DRIFT,
+        help="accuracy a full refit may have over the updated model before it is refitted")
+    parser.add_argument("--extra-features", action="store_true",
+        help="also use the Elo ratings and the form features")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    evidence, labels = load_data(args.data, args.extra_features)
+    registry = ModelRegistry(args.model_dir)
+
+    for name in args.models:
+        result = update_model(name, evidence, labels, registry,
+            get_feature_columns(args.extra_features), args.refit_every,
+            args.check, args.max_drift)
+        print(f"{MODELS[name][0]}: {result['mode']} with {result['rows']} new rows "
+            f"in {result['time']*1000:.1f}ms ({result['updates']} updates since the last refit)")
+
+        drift = result['drift']
+        if args.check and drift['rows']:
+            print(f"  accuracy on the new rows since the last refit: "
+                f"{drift['online_correct'] / drift['rows']*100:.1f}% updated, "
+                f"{drift['refit_correct'] / drift['rows']*100:.1f}% refitted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+
+DEFAULT_CACHE_DIR = '.page_cache'
+DEFAULT_MAX_AGE = 24 * 60 * 60
+USER_AGENT = 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:61.0) Gecko/20100101 Firefox/61.0'
+
+
+class OfflineCacheMiss(Exception):
+    """Raised when a page is requested in offline mode but is not cached"""
+
+
+class PageCache:
+    """Content-addressed on-disk cache for the pages we scrape
+
+    Every page body is stored once under the sha256 of its content in
+    the objects directory, and every url gets a small json entry in the
+    index directory (keyed by the sha256 of the url) that points at the
+    body together with the time it was fetched and the validators
+    (ETag / Last-Modified) the server sent with it.
+
+    Args:
+        cache_dir: directory the cache lives in
+        max_age: number of seconds a cached page is served without asking
+            the server again, None means cached pages never go stale
+        offline: only serve pages from the cache and never touch the network
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE,
+                 offline=False):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.offline = offline
+
+    def fetch(self, url, session=None, timeout=30, revalidate=True):
+        """Get the content of the page at the given url
+
+        A fresh cached copy is returned straight from disk. A stale copy
+        is revalidated with a conditional request and only downloaded
+        again if the server says it changed.
+
+        Args:
+            url: link of the page on transfermarkt
+            session: optional requests.Session used for the download
+            timeout: number of seconds to wait for the server
+            revalidate: ask the server again when the cached copy is stale,
+                pages that can not change anymore are always served as is
+
+        Returns:
+            The raw content of the page in bytes
+        """
+
+        entry = self._read_entry(url)
+        content = self._read_object(entry['sha256']) if entry else None
+
+        if content is not None and (self.offline or not revalidate
+                or self.is_fresh(entry)):
+            return content
+        if self.offline:
+            raise OfflineCacheMiss(f"Page is not in the cache: {url}")
+
+        headers = {'User-agent': USER_AGENT}
+        if content is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+
+        # The page did not change since we stored it
+        if response.status_code == 304 and content is not None:
+            entry['fetched_at'] = time.time()
+            self._write_entry(url, entry)
+            return content
+
+        response.raise_for_status()
+        self.store(url, response.content, response.headers)
+
+        return response.content
+
+    def store(self, url, content, headers=None):
+        """Add the content of a page to the cache
+
+        Args:
+            url: link of the page the content belongs to
+            content: raw content of the page in bytes
+            headers: response headers to take the validators from
+        """
+
+        headers = headers or {}
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(sha256)
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, content)
+
+        self._write_entry(url, {
+            'url': url,
+            'sha256': sha256,
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        })
+
+    def is_fresh(self, entry):
+        """Check if a cached entry can be served without revalidation"""
+
+        if self.max_age is None:
+            return True
+
+        return time.time() - entry['fetched_at'] < self.max_age
+
+    def _read_entry(self, url):
+        try:
+            with open(self._entry_path(url)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_entry(self, url, entry):
+        _atomic_write(self._entry_path(url), json.dumps(entry).encode())
+
+    def _read_object(self, sha256):
+        try:
+            with open(self._object_path(sha256), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, 'index', key[:2], key + '.json')
+
+    def _object_path(self, sha256):
+        return os.path.join(self.cache_dir, 'objects', sha256[:2], sha256)
+
+
+def _atomic_write(path, data):
+    # Write to a temporary file first so a crash never leaves half a page
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+HOME_TEAM_CLASS = "text-right no-border-rechts no-border-links hauptlink hide-for-small"
+AWAY_TEAM_CLASS = "no-border-links no-border-rechts hauptlink hide-for-small"
+MATCH_RESULT_CLASS = "matchresult finished"
+CLUB_NAME_CLASS = "hauptlink no-border-links show-for-small show-for-pad"
+MARKET_VALUE_CLASS = "rechts hide-for-small hide-for-pad"
+
+
+@dataclass(frozen=True)
+class MatchdayPage:
+    """Everything we read from the fixture page of a single matchday
+
+    Attributes:
+        home_teams: name of the home team of every fixture
+        away_teams: name of the away team of every fixture
+        home_goals: goals scored by the home team in every finished fixture
+        away_goals: goals scored by the away team in every finished fixture
+        played: index of the fixture of every finished fixture, so the
+            goals still match their fixture when one in between was postponed
+    """
+
+    home_teams: Tuple[str, ...]
+    away_teams: Tuple[str, ...]
+    home_goals: Tuple[int, ...]
+    away_goals: Tuple[int, ...]
+    played: Tuple[int, ...]
+
+    @property
+    def results(self):
+        """Result of every finished fixture
+
+        0 if the game ended in a draw, 1 if the home team won and 2 if
+        the away team won
+        """
+
+        return tuple(0 if home == away else 1 if home > away else 2
+            for home, away in zip(self.home_goals, self.away_goals))
+
+    @property
+    def fixture_results(self):
+        """Result of every fixture, None for the ones that were not played"""
+
+        results = [None] * len(self.home_teams)
+        for index, result in zip(self.played, self.results):
+            results[index] = result
+
+        return tuple(results)
+
+    @classmethod
+    def from_soup(cls, soup):
+        """Walk the fixture table of a matchday page once
+
+        Args:
+            soup: The parsed HTML data that we got from BeautifulSoup
+            on the link for the given week's fixture page on transfermarkt
+
+        Returns:
+            The MatchdayPage with the fixtures and results
+        """
+
+        home_teams = []
+        away_teams = []
+        home_goals = []
+        away_goals = []
+        played = []
+
+        table = soup.find("div", {"class": "responsive-table"})
+        for tag in table.find_all(["td", "span"]):
+            classes = tag.get("class") or []
+            joined_classes = " ".join(classes)
+
+            if tag.name == "td":
+                if joined_classes == HOME_TEAM_CLASS:
+                    team_list = home_teams
+                elif joined_classes == AWAY_TEAM_CLASS:
+                    team_list = away_teams
+                else:
+                    continue
+                for link in tag.find_all("a", {"class": "vereinprofil_tooltip"}):
+                    team_list.append(link.text.strip())
+
+            elif joined_classes == MATCH_RESULT_CLASS:
+                home_result, away_result = tag.text.strip().split(':')
+                home_goals.append(int(home_result))
+                away_goals.append(int(away_result))
+                # The result is listed after the home team of its fixture
+                played.append(len(home_teams) - 1)
+
+        return cls(
+            home_teams=tuple(home_teams),
+            away_teams=tuple(away_teams),
+            home_goals=tuple(home_goals),
+            away_goals=tuple(away_goals),
+            played=tuple(played),
+        )
+
+
+@dataclass(frozen=True)
+class ClubTable:
+    """Everything we read from the club table page of a season
+
+    Attributes:
+        teams: full team name mapped to the squad size, average age,
+            number of foreigners, average market value and total market
+            value (in thousands) of the club
+    """
+
+    teams: Dict[str, Tuple]
+
+    @classmethod
+    def from_soup(cls, soup):
+        """Walk the club table of a season page once
+
+        Args:
+            soup: The parsed HTML data that we got from BeautifulSoup
+            on the link for the given season's club table page on transfermarkt
+
+        Returns:
+            The ClubTable with the information of every club
+        """
+
+        teams = {}
+        table = soup.find("table", {"class": "items"}).find("tbody")
+
+        for row in table.find_all("tr", {"class": ["odd", "even"]}):
+            name = row.find("td", {"class": CLUB_NAME_CLASS}).text
+            squad_info = row.find_all("td", {"class": "zentriert"})
+            avg, total = row.find_all("td", {"class": MARKET_VALUE_CLASS})[:2]
+
+            teams[name.strip()] = (
+                int(squad_info[1].text.strip()), # Squad Size
+                float(squad_info[2].text.strip()), # Average Age
+                int(squad_info[3].text.strip()), # Number of Foreigners
+                parse_market_value(avg.text), # Average Market Value
+                parse_market_value(total.text, avg.text), # Total Market Value
+            )
+
+        return cls(teams=teams)
+
+
+def get_short_team_name(name):
+    """Trim the name of a team down to its main name
+
+    Since the website stores different names on the board and fixture
+    list we only keep the longer of the first two words of the name
+
+    Args:
+        name: name of the team on transfermarkt
+
+    Returns:
+        The main name of the team
+    """
+
+    name = name.strip().split('.')[-1].strip()
+    name = name.split(' ')
+    if len(name) > 1:
+        if len(name[0]) > len(name[1]):
+            name = name[0]
+        else:
+            name = name[1]
+    else:
+        name = name[0]
+
+    return name.strip()
+
+
+def parse_market_value(text, fallback_text=None):
+    """Convert a market value from transfermarkt into thousands
+
+    Args:
+        text: market value as shown on the site, e.g. '€1.50m' or '€600Th.'
+        fallback_text: text the number is read from when the value is not
+            in millions, the total market value has always been read from
+            the average market value in that case
+
+    Returns:
+        The market value in thousands
+    """
+
+    if 'm' in text:
+        return round(float(re.findall(r"\d+\.\d+", text)[0])*1000)
+
+    return round(float(re.findall(r'\d+', fallback_text or text)[0]))
@@ -0,0 +1,54 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+FIXTURES_REGION = 'fixtures'
+CLUB_TABLE_REGION = 'club_table'
+
+# Only the regions of each page that the get_* functions read are parsed.
+# get_fixture_list and get_match_results look inside div.responsive-table
+# and get_club_data reads table.items.
+STRAINERS = {
+    FIXTURES_REGION: SoupStrainer("div", {"class": "responsive-table"}),
+    CLUB_TABLE_REGION: SoupStrainer("table", {"class": "items"}),
+}
+
+
+def get_default_parser():
+    """Get the fastest HTML parser backend that is installed
+
+    Returns:
+        'lxml' if the lxml package is available, otherwise the pure python
+        'html.parser' that ships with the standard library
+    """
+
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return 'html.parser'
+
+    return 'lxml'
+
+
+def parse_page(content, region=None, parser=None):
+    """Parse the content of a transfermarkt page
+
+    Args:
+        content: raw content of the page
+        region: FIXTURES_REGION or CLUB_TABLE_REGION to only build the
+            part of the document the matching get_* functions read, None
+            parses the whole page
+        parser: name of the BeautifulSoup parser backend, defaults to
+            get_default_parser()
+
+    Returns:
+        The parsed HTML data from BeautifulSoup
+    """
+
+    parser = parser or get_default_parser()
+    strainer = STRAINERS[region] if region else None
+
+    # html5lib builds the whole tree no matter what, so it can not strain
+    if parser == 'html5lib':
+        strainer = None
+
+    return BeautifulSoup(content, parser, parse_only=strainer)
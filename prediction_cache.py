@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_TTL = 60 * 60
+
+
+def hash_features(row):
+    """Hash the feature values of one fixture
+
+    Args:
+        row: list or array with the features of the fixture
+
+    Returns:
+        A short hex digest of the features as float64
+    """
+
+    values = np.ascontiguousarray(row, dtype=np.float64)
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """In-process LRU cache of model predictions with a time to live
+
+    Entries are kept in an OrderedDict in the order they were last used, so
+    the least recently used entry is the first one evicted when the cache is
+    full. Entries older than the ttl are treated as missing.
+
+    Args:
+        max_size: maximum number of predictions kept
+        ttl: number of seconds a prediction is kept, None keeps them until
+            they are evicted
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get the cached value of a key
+
+        Returns:
+            The value, or None if the key is not cached or expired
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None
+                    or time.monotonic() - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Cache the value of a key and evict the oldest entries if full"""
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry, e.g. when a new model is loaded"""
+
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get the size of the cache and its hit and miss counters"""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,300 @@
+import argparse
+import csv
+import io
+import json
+import os
+
+import numpy as np
+
+from dataset import LABEL_COLUMN, get_season_from_match, get_teams_from_match
+
+
+RATING_COLUMNS = ['HomeElo', 'AwayElo']
+
+INITIAL_RATING = 1500.0
+DEFAULT_K = 20.0
+DEFAULT_HOME_ADVANTAGE = 60.0
+
+# Fraction of the distance to the initial rating every team loses between
+# two seasons, transfers and promotions make last season only half the story
+DEFAULT_REGRESSION = 1 / 3
+
+# Score of the home team for every value of the Result column
+HOME_SCORES = {0: 0.5, 1: 1.0, 2: 0.0}
+
+
+class EloRatings:
+    """Elo ratings of every team, updated one match at a time
+
+    A team that is new to the league starts at the initial rating. When a
+    new season starts every rating is pulled back towards the initial
+    rating by the regression fraction.
+
+    Args:
+        k: how many points a rating moves on a completely unexpected result
+        home_advantage: points added to the home team when the expected
+            result is worked out
+        regression: fraction of the distance to the initial rating that is
+            lost at the start of a season
+        ratings: dictionary with the team name as the key and its rating as
+            the value, empty for a new league
+        season: starting year of the season of the last match
+    """
+
+    def __init__(self, k=DEFAULT_K, home_advantage=DEFAULT_HOME_ADVANTAGE,
+                 regression=DEFAULT_REGRESSION, ratings=None, season=None):
+        self.k = k
+        self.home_advantage = home_advantage
+        self.regression = regression
+        self.ratings = dict(ratings or {})
+        self.season = season
+
+    def get_rating(self, team, season=None):
+        """Get the rating of a team before its next match
+
+        Args:
+            team: name of the team
+            season: season of the next match, the rating is regressed if it
+                is a later season than the last match
+        """
+
+        rating = self.ratings.get(team, INITIAL_RATING)
+        if season is not None and self.season is not None and season != self.season:
+            rating = INITIAL_RATING + (rating - INITIAL_RATING) * (1 - self.regression)
+
+        return rating
+
+    def start_season(self, season):
+        """Regress every rating if the season is different from the last match"""
+
+        if season != self.season:
+            self.ratings = {team: self.get_rating(team, season) for team in self.ratings}
+            self.season = season
+
+    def expected_score(self, home_rating, away_rating):
+        """Get the expected score of the home team, 1 for a win and 0.5 for a draw"""
+
+        difference = away_rating - home_rating - self.home_advantage
+        return 1 / (1 + 10 ** (difference / 400))
+
+    def update(self, season, home, away, result):
+        """Update the ratings with the result of a match
+
+        Args:
+            season: starting year of the season of the match
+            home: name of the home team
+            away: name of the away team
+            result: value of the Result column of the match
+
+        Returns:
+            A (home rating, away rating) tuple with the ratings before the match
+        """
+
+        self.start_season(season)
+        home_rating, away_rating = self.get_rating(home), self.get_rating(away)
+
+        change = self.k * (HOME_SCORES[result] - self.expected_score(home_rating, away_rating))
+        self.ratings[home] = home_rating + change
+        self.ratings[away] = away_rating - change
+
+        return (home_rating, away_rating)
+
+    def get_params(self):
+        return {'k': self.k, 'home_advantage': self.home_advantage,
+            'regression': self.regression}
+
+    def to_dict(self):
+        return {**self.get_params(), 'season': self.season, 'ratings': self.ratings}
+
+
+def get_ratings_paths(filename):
+    """Get the paths of the rating files that belong to a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        The paths of the csv file with the ratings of every row and the json
+        file with the state of the ratings
+    """
+
+    base = os.path.splitext(filename)[0]
+
+    return base + '.ratings.csv', base + '.ratings.json'
+
+
+def update_ratings(filename, params=None):
+    """Rate the rows that were added to a csv file since the last update
+
+    The state after the last rated row is stored with the byte offset of
+    that row in the csv file, so an update only reads and rates the new
+    rows. The ratings start over when the rows before the offset changed
+    or different parameters are given.
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+        params: dictionary with the k, home_advantage and regression of the
+            ratings, None keeps the stored ones
+
+    Returns:
+        A (rows, ratings) tuple with the number of rows that were rated and
+        the EloRatings after the last row
+    """
+
+    ratings_path, state_path = get_ratings_paths(filename)
+
+    with open(filename, 'rb') as f:
+        header_line = f.readline()
+        state = _load_state(state_path, f, ratings_path)
+        if state is not None and params is not None and \
+                {key: state[key] for key in params} != params:
+            state = None
+
+        if state is None:
+            elo = EloRatings(**(params or {}))
+            state = {'offset': f.tell(), 'last_line': header_line.decode('utf-8'),
+                'rows': 0, 'ratings_size': 0}
+            with open(ratings_path, 'w', newline='') as ratings_file:
+                csv.writer(ratings_file, lineterminator='\n').writerow([''] + RATING_COLUMNS)
+                state['ratings_size'] = ratings_file.tell()
+        else:
+            elo = EloRatings(**{key: state[key] for key in ('k', 'home_advantage',
+                'regression', 'ratings', 'season')})
+
+        f.seek(state['offset'])
+        data = f.read()
+
+    # A row that is still being written is left for the next update
+    data = data[:data.rfind(b'\n') + 1]
+    if not data:
+        return (0, elo)
+
+    header = next(csv.reader([header_line.decode('utf-8')]))
+    matches_index, label_index = header.index('Matches'), header.index(LABEL_COLUMN)
+    lines = data.decode('utf-8').splitlines(keepends=True)
+
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator='\n')
+    for index, row in enumerate(csv.reader(lines), start=state['rows']):
+        match = row[matches_index]
+        home_rating, away_rating = elo.update(get_season_from_match(match),
+            *get_teams_from_match(match), int(row[label_index]))
+        writer.writerow([index, round(home_rating, 1), round(away_rating, 1)])
+
+    # The ratings are written before the state, an update that stops in
+    # between is cut back to the size in the state
+    with open(ratings_path, 'a', newline='') as ratings_file:
+        ratings_file.write(text.getvalue())
+        ratings_file.flush()
+        os.fsync(ratings_file.fileno())
+        ratings_size = ratings_file.tell()
+
+    state = {**elo.to_dict(), 'offset': state['offset'] + len(data),
+        'last_line': lines[-1], 'rows': state['rows'] + len(lines),
+        'ratings_size': ratings_size}
+    with open(state_path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(state_path + '.tmp', state_path)
+
+    return (len(lines), elo)
+
+
+def load_ratings(filename):
+    """Get the pre-match ratings of every row of a csv file
+
+    Args:
+        filename: filename of the csv file with the webscraped data
+
+    Returns:
+        A 2D array with the RATING_COLUMNS of every row
+    """
+
+    update_ratings(filename)
+    ratings_path = get_ratings_paths(filename)[0]
+
+    return np.loadtxt(ratings_path, delimiter=',', skiprows=1, usecols=(1, 2),
+        ndmin=2).reshape(-1, len(RATING_COLUMNS))
+
+
+def get_pre_match_ratings(filename, matches):
+    """Get the ratings of fixtures that have not been played yet
+
+    Args:
+        filename: filename of the csv file with the webscraped data the
+            ratings are built from
+        matches: value of the Matches column of every fixture
+
+    Returns:
+        A 2D array with the RATING_COLUMNS of every fixture
+    """
+
+    elo = update_ratings(filename)[1]
+
+    ratings = []
+    for match in matches:
+        season = get_season_from_match(match)
+        ratings.append([elo.get_rating(team, season) for team in get_teams_from_match(match)])
+
+    return np.array(ratings, dtype=np.float64).reshape(-1, len(RATING_COLUMNS))
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the ratings
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Rate the teams with Elo ratings")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file with the webscraped data")
+    parser.add_argument("--k", type=float, default=DEFAULT_K,
+        help="how many points a rating moves on a completely unexpected result")
+    parser.add_argument("--home-advantage", type=float, default=DEFAULT_HOME_ADVANTAGE,
+        help="points added to the home team when the expected result is worked out")
+    parser.add_argument("--regression", type=float, default=DEFAULT_REGRESSION,
+        help="fraction of the distance to the initial rating lost between seasons")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    rows, elo = update_ratings(args.data, {'k': args.k,
+        'home_advantage': args.home_advantage, 'regression': args.regression})
+    print(f"Rated {rows} new matches\n")
+
+    for team, rating in sorted(elo.ratings.items(), key=lambda item: -item[1]):
+        print(f"{team:<30}{rating:>8.1f}")
+
+
+def _load_state(state_path, f, ratings_path):
+    # The state is only used when the csv file still has the rows it was
+    # built from, f is the csv file opened in binary mode
+    try:
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    last_line = state['last_line'].encode('utf-8')
+    start = f.tell()
+    f.seek(max(state['offset'] - len(last_line), 0))
+    unchanged = f.read(len(last_line)) == last_line
+    f.seek(start)
+
+    if not unchanged or state['offset'] < len(last_line):
+        return None
+    if not os.path.exists(ratings_path) or os.path.getsize(ratings_path) < state['ratings_size']:
+        return None
+
+    os.truncate(ratings_path, state['ratings_size'])
+    return state
+
+
+if __name__ == "__main__":
+    main()
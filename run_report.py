@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class RunReport:
+    """Wall time, counts and peak memory of the stages of a scrape run
+
+    Every stage adds up the seconds spent in it and how often it ran.
+    Stages that run on the download threads (fetch and download) overlap
+    each other, so their seconds can add up to more than the wall time of
+    the run. The fetch_wait stage is the time the scraper sat waiting for a
+    page, which is what makes a run network bound.
+
+    Args:
+        show_progress: print a line with the live metrics after every matchday
+    """
+
+    def __init__(self, show_progress=False):
+        self.show_progress = show_progress
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.seasons = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, count=1):
+        """Time the code inside the with block as part of a stage"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, count)
+
+    def add(self, name, seconds, count=1):
+        """Add time spent in a stage"""
+
+        with self._lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+            stage['seconds'] += seconds
+            stage['count'] += count
+
+    def increment(self, name, count=1):
+        """Add to one of the counters, e.g. the number of rows written"""
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def add_season(self, season, matchdays, rows, seconds):
+        """Record how long a season took and the peak memory after it"""
+
+        self.seasons.append({'season': season, 'matchdays': matchdays, 'rows': rows,
+            'seconds': seconds, 'peak_rss_kib': get_peak_memory()})
+
+    def merge(self, other):
+        """Add the stages and counters of a report from a worker process
+
+        Args:
+            other: the dictionary from to_dict of the other report
+        """
+
+        for name, stage in other['stages'].items():
+            self.add(name, stage['seconds'], stage['count'])
+        for name, count in other['counters'].items():
+            self.increment(name, count)
+        self.seasons.extend(other['seasons'])
+
+    def log_progress(self, done, total):
+        """Print the live metrics of the run if show_progress is set
+
+        Args:
+            done: number of matchdays written so far
+            total: number of matchdays in the run
+        """
+
+        if not self.show_progress:
+            return
+
+        elapsed = time.perf_counter() - self._start
+        with self._lock:
+            stages = ', '.join(f"{name} {stage['seconds']:.1f}s"
+                for name, stage in self.stages.items())
+        peak = get_peak_memory()
+        memory = f", peak {peak / 1024:.0f} MiB" if peak is not None else ''
+        print(f"[{done}/{total} matchdays, {elapsed:.1f}s, "
+            f"{done / elapsed if elapsed else 0:.2f}/s] {stages}{memory}", file=sys.stderr)
+
+    def to_dict(self):
+        """Get the report as a dictionary that can be written as json"""
+
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'wall_seconds': time.perf_counter() - self._start,
+                'peak_rss_kib': get_peak_memory(),
+                'peak_rss_children_kib': get_peak_memory(children=True),
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'counters': dict(self.counters),
+                'seasons': list(self.seasons),
+            }
+
+    def write(self, path):
+        """Write the report to a json file"""
+
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+
+def get_peak_memory(children=False):
+    """Get the peak resident memory of this process or its children in KiB
+
+    Returns:
+        The peak memory, or None on platforms without the resource module
+    """
+
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+
+    # Linux reports the peak in KiB and macOS in bytes
+    if sys.platform == 'darwin':
+        return usage.ru_maxrss // 1024
+    return usage.ru_maxrss
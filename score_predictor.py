@@ -1,134 +1,253 @@
+import argparse
 import csv
+import json
 import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+from sklearn.base import clone
+from sklearn.decomposition import PCA
+from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.naive_bayes import GaussianNB
 from sklearn import svm
 
-def main():
-    team_data = 'TeamData.csv'
-    evidence, labels = load_data(team_data)
+from dataset import FEATURE_COLUMNS, LABEL_COLUMN, load_columnar_dataset
+from features import get_feature_columns, load_features
+from model_registry import DEFAULT_MODEL_DIR, ModelRegistry
+
+
+# K-nearest neighbor looks for neighbors in the first principal components
+# of the scaled features, where a kd-tree prunes most of the rows. tuning.py
+# can keep every component instead, the 'auto' search then compares with
+# every row since a tree is slower than that in all of the features
+KNN_COMPONENTS = 6
+
+# Every model we try, with the name it is printed under and an unfitted
+# estimator that is cloned for every fit. Adding a model is adding a line here
+MODELS = {
+    'logistic_regression': ("logistic regression",
+        make_pipeline(StandardScaler(), LogisticRegression(max_iter=10000))),
+    'naive_bayes': ("naive bayes", GaussianNB()),
+    'k_nearest_neighbor': ("K-Nearest neighbor", make_pipeline(StandardScaler(),
+        PCA(n_components=KNN_COMPONENTS, random_state=0),
+        KNeighborsClassifier(n_neighbors=25, algorithm='auto'))),
+    'random_forest': ("random forest", DecisionTreeClassifier(random_state=1)),
+    'support_vector_machine': ("support vector machine",
+        make_pipeline(StandardScaler(), svm.SVC())),
+    'gradient_boosting': ("gradient boosting", GradientBoostingClassifier(random_state=42)),
+    'sgd_logistic_regression': ("SGD logistic regression",
+        make_pipeline(StandardScaler(), SGDClassifier(loss='log_loss', random_state=0))),
+}
+
+# Hyperparameters found by tuning.py, they replace the defaults above
+MODEL_PARAMS = 'model_params.json'
+
+# The old numbered model types, 1 is logistic regression and so on
+MODEL_TYPES = ['logistic_regression', 'naive_bayes', 'k_nearest_neighbor',
+    'random_forest', 'support_vector_machine']
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    evidence, labels = load_data(args.data, args.extra_features)
     X_train, X_test, y_train, y_test = train_test_split(
-        evidence, labels, test_size=0.2
+        evidence, labels, test_size=0.2, random_state=args.seed
     )
 
-    # Train model and make predictions
-    logistic_regression_model = train_model(X_train, y_train, 1)
-    naive_bayes_model = train_model(X_train, y_train, 2)
-    knearest_neighbor_model = train_model(X_train, y_train, 3)
-    random_forest_model = train_model(X_train, y_train, 4)
-    svm_model = train_model(X_train, y_train, 5)
+    # Train every model at the same time and print how they did
+    report = train_models(X_train, y_train, X_test, y_test, args.models,
+        workers=args.workers, threads=args.threads)
+    print_report(report)
+
+    # Store the models trained on all of the data for the app and the notebook
+    if args.save:
+        registry = ModelRegistry(args.model_dir)
+        for name in args.models:
+            get_trained_model(name, evidence, labels, registry,
+                get_feature_columns(args.extra_features))
+
 
-    evaluate(X_test, y_test, logistic_regression_model, 1)
-    evaluate(X_test, y_test, naive_bayes_model, 2)
-    evaluate(X_test, y_test, knearest_neighbor_model, 3)
-    evaluate(X_test, y_test, random_forest_model, 4)
-    evaluate(X_test, y_test, svm_model, 5)
+def parse_args(argv=None):
+    """Parse the command line options of the score predictor
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
 
+    Returns:
+        The parsed arguments
+    """
 
-def load_data(filename):
+    parser = argparse.ArgumentParser(description="Train and compare the match result models")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file with the webscraped data")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS),
+        help="models to train, defaults to every model")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+        help="number of models trained at the same time")
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the train/test split, use backtest.py for a split by season")
+    parser.add_argument("--threads", action="store_true",
+        help="train in threads instead of worker processes")
+    parser.add_argument("--save", action="store_true",
+        help="also train the models on all of the data and store them in the model registry")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR,
+        help="directory the trained models are stored in")
+    parser.add_argument("--extra-features", action="store_true",
+        help="also train on the Elo ratings and the form features")
+
+    return parser.parse_args(argv)
+
+
+def load_data(filename, extra_features=False):
     """Load data from the given csv file name
 
     This function seperates the labels and the evidence from the csv
-    file with all the webscraped data
+    file with all the webscraped data. When the columnar .npy files that
+    belong to the csv file are up to date they are memory-mapped instead
+    of parsing the csv file
 
     Args:
         filename: filename of the csv file with the webscraped data
+        extra_features: add the ratings and form features from the feature
+            store, the columns are features.get_feature_columns(True)
 
     Returns:
-        The list of labels and evidence gotten from the csv file
+        The arrays of evidence and labels gotten from the csv file
     """
 
-    evidence_list = []
-    label_list = []
+    columnar = load_columnar_dataset(filename)
+    if columnar is not None:
+        evidence, labels = columnar
+    else:
+        evidence, labels = _read_csv_data(filename)
+
+    if extra_features:
+        evidence = np.hstack([evidence, load_features(filename)])
+
+    return (evidence, labels)
+
+
+def get_model_name(type):
+    """Get the name of a model in MODELS
+
+    Args:
+        type: name of the model, or one of the old model numbers 1 to 5
+
+    Returns:
+        The name of the model in MODELS
+    """
+
+    if isinstance(type, int):
+        return MODEL_TYPES[type - 1]
+    if type not in MODELS:
+        raise ValueError(f"Unknown model: {type}")
+
+    return type
+
+
+def get_model(type, model_params=MODEL_PARAMS):
+    """Get a new unfitted estimator for the given model type
+
+    Args:
+        type: name of the model in MODELS or its old number
+        model_params: json file with the tuned hyperparameters of the models
+
+    Returns:
+        The estimator with the tuned hyperparameters if there are any,
+        hyperparameters the estimator no longer has are left out with a
+        warning
+    """
+
+    name = get_model_name(type)
+    model = clone(MODELS[name][1])
+    params = load_model_params(model_params).get(name, {})
+
+    return model.set_params(**_get_valid_params(name, model, params))
+
+
+def load_model_params(filename=MODEL_PARAMS):
+    """Load the tuned hyperparameters of every model
+
+    Args:
+        filename: json file written by tuning.py
+
+    Returns:
+        A dictionary with the model name as the key and a dictionary of its
+        hyperparameters as the value, empty if nothing was tuned yet
+    """
+
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
-    with open(filename) as f:
-        csv_reader = csv.DictReader(f)
-        for row in csv_reader:
-            evidence_list.append([
-                int(row['Matchday']),
-                int(row['HomePositions']),
-                int(row['AwayPositions']),
-                int(row['HomeWins']),
-                int(row['AwayWins']),
-                int(row['HomeDraws']),
-                int(row['AwayDraws']),
-                int(row['HomeLosses']),
-                int(row['AwayLosses']),
-                int(row['HomeGoalsScored']),
-                int(row['AwayGoalsScored']),
-                int(row['HomeGoalsConceded']),
-                int(row['AwayGoalsConceded']),
-                int(row['HomeGoalDiff']),
-                int(row['AwayGoalDiff']),
-                int(row['HomePoints']),
-                int(row['AwayPoints']),
-                int(row['HomeSquadSize']),
-                int(row['AwaySquadSize']),
-                float(row['HomeAvgAge']),
-                float(row['AwayAvgAge']),
-                int(row['HomeNumForeigners']),
-                int(row['AwayNumForeigners']),
-                int(row['HomeAvgMarketVal']),
-                int(row['AwayAvgMarketVal']),
-                int(row['HomeMarketVal']),
-                int(row['AwayMarketVal']),
-            ])
-
-            label_list.append(int(row['Result']))
-
-    return (evidence_list, label_list)
+
+def save_model_params(model_params, filename=MODEL_PARAMS):
+    """Write the tuned hyperparameters of every model to a json file"""
+
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(model_params, f, indent=2, sort_keys=True)
+    os.replace(filename + '.tmp', filename)
 
 
 def train_model(evidence, labels, type):
     """Train the machine learning models
 
-    This function trains machine learning model for logistic regression, 
+    This function trains machine learning model for logistic regression,
     naive bayes, K-nearest neighbor, random forest, and support vector machine
 
     Args:
         evidence: list of evidence from the csv file
         labels: list of labels from the csv file
-        type: type of machine learning algortithm
+        type: type of machine learning algortithm, the name of the model in
+            MODELS or its old number
 
     Returns:
-        The model after fitting the evidence and labels to the 5 algorithms
+        The model after fitting the evidence and labels to the algorithm
     """
 
-    model = None
+    return get_model(type).fit(evidence, labels)
+
 
-    # Logistic Regression Model
-    if type == 1:
-        model = LogisticRegression(max_iter=10000).fit(evidence, labels)
-    
-    # Naive Bayes Model
-    if type == 2:
-        model = GaussianNB().fit(evidence, labels)
+def get_trained_model(type, evidence, labels, registry=None, columns=FEATURE_COLUMNS):
+    """Get a model trained on the given data from the model registry
 
-    # K-Nearest Neighbor Model
-    if type == 3:
-        model = KNeighborsClassifier(n_neighbors=1).fit(evidence, labels)
+    The model is only trained when the registry has no model for the same
+    data and hyperparameters yet, otherwise the stored model is loaded.
+
+    Args:
+        type: name of the model in MODELS or its old number
+        evidence: 2D array of evidence to train on
+        labels: array of labels to train on
+        registry: the ModelRegistry to use, defaults to the models directory
+        columns: names of the feature columns of the evidence
 
-    # Random Forest Model
-    if type == 4:
-        model = DecisionTreeClassifier(random_state=1).fit(evidence, labels)
+    Returns:
+        The fitted model
+    """
 
-    # Support Vector Machine Model
-    if type == 5:
-        model = svm.SVC().fit(evidence, labels)
+    name = get_model_name(type)
+    registry = registry or ModelRegistry()
 
-    return model
+    return registry.get_or_train(name, get_model(name), evidence, labels, columns)
 
 
 def evaluate(x_test, y_test, predictions, type):
     """Find the accuract percentage of the models
 
-    This function prints the accuracy percentage for each of the five models
+    This function prints the accuracy percentage of the given model
 
     Args:
         x_test: evidence that were allocated for testing
@@ -137,34 +256,135 @@ def evaluate(x_test, y_test, predictions, type):
         type: type of model
 
     Returns:
-        The same list as the score_list but all the values are converted to int
+        The accuracy of the model
+    """
+
+    score = round(predictions.score(x_test, y_test), 2)
+    print(f"Score for the {MODELS[get_model_name(type)][0]} model: {score*100}%")
+
+    return score
+
+
+def fit_and_score(type, X_train, y_train, X_test, y_test):
+    """Train one model and time how long it takes to fit and predict
+
+    Args:
+        type: name of the model in MODELS or its old number
+        X_train: evidence that were allocated for training
+        y_train: labels that were allocated for training
+        X_test: evidence that were allocated for testing
+        y_test: labels that were allocated for testing
+
+    Returns:
+        A dictionary with the model name, accuracy, fit time and predict
+        time in seconds and the fitted estimator
+    """
+
+    name = get_model_name(type)
+
+    start = time.perf_counter()
+    model = get_model(name).fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = model.predict(X_test)
+    predict_time = time.perf_counter() - start
+
+    return {
+        'model': name,
+        'accuracy': float(np.mean(predictions == y_test)),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+        'estimator': model,
+    }
+
+
+def train_models(X_train, y_train, X_test, y_test, models=None, workers=None,
+                 threads=False):
+    """Train and score several models at the same time
+
+    Every model is fitted in its own worker process, or thread if threads
+    is set, so the slow models do not hold up the others.
+
+    Args:
+        X_train: evidence that were allocated for training
+        y_train: labels that were allocated for training
+        X_test: evidence that were allocated for testing
+        y_test: labels that were allocated for testing
+        models: names of the models to train, defaults to every model in MODELS
+        workers: number of models trained at the same time, 1 trains them
+            one after another in this process
+        threads: use a thread pool instead of a process pool
+
+    Returns:
+        The report, a list with the dictionary from fit_and_score of every
+        model in the order of models
     """
 
-    # Logistic Regression Predictions
-    if type == 1:
-        score = round(predictions.score(x_test, y_test), 2)
-        print(f"Score for the logistic regression model: {score*100}%")
-    
-    # Naive Bayes Predictions
-    if type == 2:
-        score = round(predictions.score(x_test, y_test), 2)
-        print(f"Score for the naive bayes model: {score*100}%")
-
-    # K-Nearest Neighbor Predictions
-    if type == 3:
-        score = round(predictions.score(x_test, y_test), 2)
-        print(f"Score for the K-Nearest neighbor model: {score*100}%")
-
-    # Random Forest Predictions
-    if type == 4:
-        score = round(predictions.score(x_test, y_test), 2)
-        print(f"Score for the random forest model: {score*100}%")
-
-    # Support Vector Machine Predictions
-    if type == 5:
-        score = round(predictions.score(x_test, y_test), 2)
-        print(f"Score for the support vector machine model: {score*100}%")
-    
+    models = list(models or MODELS)
+    if workers == 1:
+        return [fit_and_score(name, X_train, y_train, X_test, y_test) for name in models]
+
+    # np.asarray does not copy memory-mapped arrays, threads share the mapped
+    # pages and every worker process gets the arrays pickled with its model
+    X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+    X_test, y_test = np.asarray(X_test), np.asarray(y_test)
+
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor(max_workers=workers) as pool:
+        futures = [pool.submit(fit_and_score, name, X_train, y_train, X_test, y_test)
+            for name in models]
+        return [future.result() for future in futures]
+
+
+def print_report(report):
+    """Print the accuracy and timings of every model in a report"""
+
+    print(f"{'Model':<25}{'Accuracy':>10}{'Fit (s)':>10}{'Predict (s)':>13}")
+    for result in report:
+        print(f"{MODELS[result['model']][0]:<25}{result['accuracy']*100:>9.1f}%"
+            f"{result['fit_time']:>10.3f}{result['predict_time']:>13.3f}")
+
+
+def _get_valid_params(name, model, params):
+    # Tuned hyperparameters of a model that was turned into a pipeline
+    # since are moved to the step that has them, e.g. n_neighbors to
+    # kneighborsclassifier__n_neighbors
+    valid = model.get_params()
+    valid_params = {}
+    for key, value in params.items():
+        if key not in valid:
+            steps = [param for param in valid if param.endswith('__' + key)]
+            if len(steps) != 1:
+                warnings.warn(f"Ignoring the tuned {key} of {name}, the model has no such "
+                    f"hyperparameter, run tuning.py again")
+                continue
+            warnings.warn(f"Using the tuned {key} of {name} as {steps[0]}")
+            key = steps[0]
+        valid_params[key] = value
+
+    return valid_params
+
+
+def _read_csv_data(filename):
+    # Parse the evidence and labels from the csv file itself
+    evidence_list = []
+    label_list = []
+
+    with open(filename) as f:
+        csv_reader = csv.reader(f)
+        header = next(csv_reader, [])
+        feature_indices = [header.index(column) for column in FEATURE_COLUMNS]
+        label_index = header.index(LABEL_COLUMN)
+        for row in csv_reader:
+            evidence_list.append([float(row[index]) for index in feature_indices])
+            label_list.append(int(row[label_index]))
+
+    evidence = np.array(evidence_list, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+    labels = np.array(label_list, dtype=np.int64)
+
+    return (evidence, labels)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset import FEATURE_COLUMNS, get_teams_from_match
+from features import get_feature_columns, get_fixture_features
+from model_registry import DEFAULT_MODEL_DIR, ModelRegistry
+from score_predictor import MODELS, get_trained_model, load_data
+
+
+REMAINING_FIXTURES = 'RemainingFixtures.csv'
+DEFAULT_SIMULATIONS = 100000
+DEFAULT_BATCH_SIZE = 10000
+
+# Points of the home and away team for every value of the Result column,
+# 0 is a draw, 1 a home win and 2 an away win
+HOME_POINTS = np.array([1, 3, 0], dtype=np.float32)
+AWAY_POINTS = np.array([1, 0, 3], dtype=np.float32)
+
+# Fixtures and table of a worker process, set once by _init_worker
+_season = None
+
+
+def load_remaining_fixtures(filename=REMAINING_FIXTURES, team_data=None):
+    """Load the fixtures that still have to be played and the current table
+
+    Every row has the standings of both teams before its matchday, so the
+    table is taken from the first remaining fixture of every team.
+
+    Args:
+        filename: csv file written by curr_season_webscraper --remaining
+        team_data: csv file with the webscraped data, when it is given the
+            ratings and form features built from it are added to the evidence
+
+    Returns:
+        A dictionary with the name of every team, the home and away team
+        index of every fixture, the 2D array of the features of every
+        fixture and the points, goal difference and goals scored of every
+        team in the current table
+    """
+
+    data = pd.read_csv(filename).sort_values('Matchday', kind='stable')
+    fixtures = [get_teams_from_match(match) for match in data['Matches']]
+
+    teams = sorted({team for fixture in fixtures for team in fixture})
+    team_index = {team: index for index, team in enumerate(teams)}
+    home = np.array([team_index[fixture[0]] for fixture in fixtures], dtype=np.int64)
+    away = np.array([team_index[fixture[1]] for fixture in fixtures], dtype=np.int64)
+
+    table = {column: np.zeros(len(teams), dtype=np.int64)
+        for column in ('Points', 'GoalDiff', 'GoalsScored')}
+    seen = set()
+    for row, fixture in zip(data.itertuples(index=False), fixtures):
+        for side, team in zip(('Home', 'Away'), fixture):
+            if team not in seen:
+                seen.add(team)
+                for column, values in table.items():
+                    values[team_index[team]] = getattr(row, side + column)
+
+    evidence = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    if team_data is not None:
+        evidence = np.hstack([evidence, get_fixture_features(team_data, data)])
+
+    return {
+        'teams': teams,
+        'home': home,
+        'away': away,
+        'evidence': evidence,
+        'points': table['Points'],
+        'goal_diff': table['GoalDiff'],
+        'goals_scored': table['GoalsScored'],
+    }
+
+
+def load_model(name, model_dir=DEFAULT_MODEL_DIR, data='TeamData.csv', extra_features=False):
+    """Load the latest model from the registry, or train and store it
+
+    Args:
+        name: name of the model in score_predictor.MODELS
+        model_dir: directory of the model registry
+        data: csv file the model is trained on when the registry has none
+        extra_features: use the model with the ratings and form features
+
+    Returns:
+        The fitted model
+    """
+
+    columns = get_feature_columns(extra_features)
+    registry = ModelRegistry(model_dir)
+    stored = registry.load_latest(name)
+    if stored is None or stored[1]['features'] != columns:
+        evidence, labels = load_data(data, extra_features)
+        return get_trained_model(name, evidence, labels, registry, columns)
+
+    return stored[0]
+
+
+def get_outcome_probabilities(model, evidence):
+    """Get the probability of a draw, home win and away win of every fixture
+
+    Args:
+        model: fitted model with predict_proba
+        evidence: 2D array with the features of every fixture
+
+    Returns:
+        A 2D array with a row for every fixture and the probabilities in
+        the order of the Result values 0, 1 and 2
+    """
+
+    if not hasattr(model, 'predict_proba'):
+        raise ValueError("The model can not predict probabilities")
+
+    probabilities = np.zeros((len(evidence), 3))
+    if len(evidence):
+        for column, result in zip(model.predict_proba(evidence).T, model.classes_):
+            probabilities[:, int(result)] = column
+
+    return probabilities
+
+
+def get_tiebreak_rank(goal_diff, goals_scored):
+    """Rank the teams on the tiebreakers that the simulation does not change
+
+    The model only predicts results, not scores, so teams level on points
+    are split by their current goal difference and then goals scored.
+
+    Returns:
+        The rank of every team, 0 for the worst, teams that are level on
+        both share a rank
+    """
+
+    keys = np.stack([goal_diff, goals_scored], axis=1)
+    _, ranks = np.unique(keys, axis=0, return_inverse=True)
+
+    return ranks.reshape(-1)
+
+
+def simulate_batch(size, seed, season=None):
+    """Simulate the rest of the season a number of times
+
+    The result of every fixture in every simulation is drawn at once, the
+    points are added up with one matrix product per side and the tables
+    are sorted together. Teams that are still level after the tiebreakers
+    are ordered at random.
+
+    Args:
+        size: number of simulations
+        seed: seed or SeedSequence of the random results
+        season: dictionary from load_remaining_fixtures with the
+            'probabilities' of every fixture added, defaults to the season
+            of the worker process
+
+    Returns:
+        A (positions, points) tuple with how often every team finished in
+        every position and the total points of every team
+    """
+
+    season = season if season is not None else _season
+    rng = np.random.default_rng(seed)
+    num_teams = len(season['teams'])
+    num_fixtures = len(season['home'])
+
+    # Every fixture is one column of the draws, a draw below the first
+    # cumulative probability is a draw, below the second a home win
+    cumulative = np.cumsum(season['probabilities'], axis=1)
+    draws = rng.random((size, num_fixtures))
+    results = (draws >= cumulative[:, 0]).astype(np.int8) + (draws >= cumulative[:, 1])
+
+    home_teams = np.zeros((num_fixtures, num_teams), dtype=np.float32)
+    home_teams[np.arange(num_fixtures), season['home']] = 1
+    away_teams = np.zeros((num_fixtures, num_teams), dtype=np.float32)
+    away_teams[np.arange(num_fixtures), season['away']] = 1
+
+    points = season['points'] + HOME_POINTS[results] @ home_teams + AWAY_POINTS[results] @ away_teams
+    points = np.rint(points).astype(np.int64)
+
+    # Points and tiebreak ranks are whole numbers, so the random fraction
+    # only orders teams that are level on both
+    keys = points * num_teams + get_tiebreak_rank(season['goal_diff'], season['goals_scored'])
+    order = np.argsort(-(keys + rng.random((size, num_teams))), axis=1)
+    finishes = np.empty_like(order)
+    np.put_along_axis(finishes, order, np.arange(num_teams), axis=1)
+
+    positions = np.bincount((np.arange(num_teams) * num_teams + finishes).ravel(),
+        minlength=num_teams * num_teams).reshape(num_teams, num_teams)
+
+    return (positions, points.sum(axis=0))
+
+
+def simulate_season(season, simulations=DEFAULT_SIMULATIONS, batch_size=DEFAULT_BATCH_SIZE,
+                    workers=None, seed=0):
+    """Simulate the rest of the season in batches in a pool of worker processes
+
+    Every batch gets its own seed from the seed of the run, so the result
+    is the same for any number of workers.
+
+    Args:
+        season: dictionary from load_remaining_fixtures with the
+            'probabilities' of every fixture added
+        simulations: number of times the season is simulated
+        batch_size: number of simulations drawn at once
+        workers: number of batches simulated at the same time, 1 runs them
+            one after another in this process
+        seed: seed of the run
+
+    Returns:
+        A dictionary with the teams, the number of simulations, the
+        probability of every team to finish in every position, the
+        expected points of every team and the time in seconds
+    """
+
+    num_batches = -(-simulations // batch_size)
+    sizes = [min(batch_size, simulations - start) for start in range(0, simulations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(num_batches)
+
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(season)
+        batches = [simulate_batch(size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+    else:
+        # The fixtures are sent to every worker once instead of with every batch
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                initargs=(season,)) as pool:
+            batches = list(pool.map(simulate_batch, sizes, seeds))
+
+    positions = sum(batch[0] for batch in batches)
+    points = sum(batch[1] for batch in batches)
+
+    return {
+        'teams': season['teams'],
+        'simulations': simulations,
+        'positions': positions / simulations,
+        'expected_points': points / simulations,
+        'time': time.perf_counter() - start,
+    }
+
+
+def print_report(result, european_places, relegation_places):
+    """Print the expected points and the title, European and relegation odds"""
+
+    positions = result['positions']
+    num_teams = len(result['teams'])
+
+    print(f"{'Team':<30}{'Points':>8}{'Position':>10}{'Title':>8}{'Europe':>8}{'Relegated':>11}")
+    expected_positions = positions @ np.arange(1, num_teams + 1)
+    for index in np.argsort(expected_positions):
+        team = positions[index]
+        print(f"{result['teams'][index]:<30}{result['expected_points'][index]:>8.1f}"
+            f"{expected_positions[index]:>10.1f}{team[0]*100:>7.1f}%"
+            f"{team[:european_places].sum()*100:>7.1f}%"
+            f"{team[num_teams - relegation_places:].sum()*100:>10.1f}%")
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the season simulation
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Simulate the rest of the current season")
+    parser.add_argument("--fixtures", default=REMAINING_FIXTURES,
+        help="csv file with the remaining fixtures from curr_season_webscraper --remaining")
+    parser.add_argument("--model", choices=list(MODELS), default='gradient_boosting',
+        help="model that predicts the result probabilities")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR,
+        help="directory of the model registry")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file the model is trained on when the registry has none")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS,
+        help="number of times the season is simulated")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help="number of simulations drawn at once")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+        help="number of batches simulated at the same time")
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the simulation")
+    parser.add_argument("--european-places", type=int, default=4,
+        help="number of places that qualify for Europe")
+    parser.add_argument("--relegation-places", type=int, default=3,
+        help="number of places that are relegated")
+    parser.add_argument("--output",
+        help="json file the finishing position distribution of every team is written to")
+    parser.add_argument("--extra-features", action="store_true",
+        help="predict with the model that also uses the Elo ratings and the form features")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    season = load_remaining_fixtures(args.fixtures,
+        args.data if args.extra_features else None)
+    model = load_model(args.model, args.model_dir, args.data, args.extra_features)
+    season['probabilities'] = get_outcome_probabilities(model, season['evidence'])
+
+    result = simulate_season(season, args.simulations, args.batch_size, args.workers, args.seed)
+    print(f"Simulated {len(season['home'])} fixtures {args.simulations} times "
+        f"in {result['time']:.1f}s\n")
+    print_report(result, args.european_places, args.relegation_places)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'simulations': result['simulations'],
+                'teams': {team: {'expected_points': float(result['expected_points'][index]),
+                    'positions': result['positions'][index].tolist()}
+                for index, team in enumerate(result['teams'])}}, f, indent=2)
+
+
+def _init_worker(season):
+    global _season
+    _season = season
+
+
+if __name__ == "__main__":
+    main()
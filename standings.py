@@ -0,0 +1,116 @@
+import numpy as np
+import pandas
+
+
+STANDINGS_COLUMNS = ['Positions', 'Wins', 'Draws', 'Losses', 'GoalsScored',
+    'GoalsConceded', 'GoalDiff', 'Points']
+
+
+def get_season_results(matchday_pages):
+    """Combine the fixtures of every matchday of a season into one table
+
+    Args:
+        matchday_pages: dictionary with the matchday number as the key and
+            its MatchdayPage as the value
+
+    Returns:
+        A DataFrame with a row for every fixture with the Matchday,
+        HomeTeam, AwayTeam, HomeGoals and AwayGoals columns, the goals of
+        fixtures that have not been played yet are NaN
+    """
+
+    columns = {'Matchday': [], 'HomeTeam': [], 'AwayTeam': [],
+        'HomeGoals': [], 'AwayGoals': []}
+
+    for matchday in sorted(matchday_pages):
+        page = matchday_pages[matchday]
+        num_fixtures = len(page.home_teams)
+        home_goals = [np.nan] * num_fixtures
+        away_goals = [np.nan] * num_fixtures
+        for index, home, away in zip(page.played, page.home_goals, page.away_goals):
+            home_goals[index] = home
+            away_goals[index] = away
+
+        columns['Matchday'] += [matchday] * num_fixtures
+        columns['HomeTeam'] += page.home_teams
+        columns['AwayTeam'] += page.away_teams
+        columns['HomeGoals'] += home_goals
+        columns['AwayGoals'] += away_goals
+
+    return pandas.DataFrame(columns)
+
+
+def get_standings_before_matchday(results):
+    """Build the league table of every team before every matchday
+
+    The table is built in one pass by summing the results of every team
+    per matchday, taking the cumulative sum over the matchdays and ranking
+    the teams of each matchday by points, goal difference and goals scored.
+
+    Args:
+        results: the DataFrame returned by get_season_results
+
+    Returns:
+        A DataFrame indexed by (team, matchday) with the STANDINGS_COLUMNS
+        of the team before that matchday was played
+    """
+
+    played = results.dropna(subset=['HomeGoals', 'AwayGoals'])
+    team_results = pandas.concat([
+        pandas.DataFrame({'Team': played['HomeTeam'], 'Matchday': played['Matchday'],
+            'GoalsScored': played['HomeGoals'], 'GoalsConceded': played['AwayGoals']}),
+        pandas.DataFrame({'Team': played['AwayTeam'], 'Matchday': played['Matchday'],
+            'GoalsScored': played['AwayGoals'], 'GoalsConceded': played['HomeGoals']}),
+    ])
+    team_results['Wins'] = team_results['GoalsScored'] > team_results['GoalsConceded']
+    team_results['Draws'] = team_results['GoalsScored'] == team_results['GoalsConceded']
+    team_results['Losses'] = team_results['GoalsScored'] < team_results['GoalsConceded']
+
+    # Every team gets a row for every matchday, even the ones it did not play
+    teams = pandas.unique(pandas.concat([results['HomeTeam'], results['AwayTeam']]))
+    matchdays = np.arange(1, results['Matchday'].max() + 1)
+    index = pandas.MultiIndex.from_product([teams, matchdays], names=['Team', 'Matchday'])
+    totals = team_results.groupby(['Team', 'Matchday']).sum().reindex(index, fill_value=0)
+    totals = totals[['Wins', 'Draws', 'Losses', 'GoalsScored', 'GoalsConceded']].astype(int)
+
+    # The standings before a matchday are the totals after the previous one
+    table = totals.groupby(level='Team').cumsum().groupby(level='Team').shift(1, fill_value=0)
+    table['GoalDiff'] = table['GoalsScored'] - table['GoalsConceded']
+    table['Points'] = 3 * table['Wins'] + table['Draws']
+
+    ranked = table.reset_index().sort_values(
+        ['Matchday', 'Points', 'GoalDiff', 'GoalsScored', 'Team'],
+        ascending=[True, False, False, False, True])
+    ranked['Positions'] = ranked.groupby('Matchday').cumcount() + 1
+
+    # Nobody has a position before the first matchday
+    ranked.loc[ranked['Matchday'] == 1, 'Positions'] = 0
+
+    return ranked.set_index(['Team', 'Matchday'])[STANDINGS_COLUMNS]
+
+
+def get_standings_features(results):
+    """Get the standings of both teams before every fixture
+
+    Args:
+        results: the DataFrame returned by get_season_results
+
+    Returns:
+        A DataFrame with the same index as results, the Matchday column and
+        a Home and Away version of every column in STANDINGS_COLUMNS, e.g.
+        HomePoints and AwayPoints
+    """
+
+    features = pandas.DataFrame({'Matchday': results['Matchday']}, index=results.index)
+    if results.empty:
+        return features
+
+    table = get_standings_before_matchday(results)
+
+    for side in ('Home', 'Away'):
+        keys = pandas.MultiIndex.from_arrays([results[side + 'Team'], results['Matchday']])
+        side_table = table.reindex(keys)
+        for column in STANDINGS_COLUMNS:
+            features[side + column] = side_table[column].to_numpy()
+
+    return features
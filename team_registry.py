@@ -0,0 +1,197 @@
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+from page_model import get_short_team_name
+
+
+LOGO_DIR = 'Club_Logos'
+
+# Team ids shorter than this are too likely to be part of another name to
+# be matched as a substring
+MIN_SUBSTRING_LENGTH = 4
+
+
+def normalize_team_name(name):
+    """Normalize a team name so different spellings compare equal
+
+    Accents are removed, everything is lower case and every character that
+    is not a letter or a digit becomes a single space, so 'Beşiktaş JK'
+    and 'Besiktas_JK' both become 'besiktas jk'.
+
+    Args:
+        name: name of the team
+
+    Returns:
+        The normalized name
+    """
+
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = name.replace('ı', 'i').lower()
+
+    return re.sub(r'[^a-z0-9]+', ' ', name).strip()
+
+
+def get_team_id(name):
+    """Get the id a team is registered under
+
+    The id is the normalized short name of the team, or the normalized full
+    name when the short name is empty, e.g. for 'Galatasaray A.S.' where
+    get_short_team_name keeps the part after the last dot.
+
+    Args:
+        name: full name of the team
+
+    Returns:
+        The id of the team
+    """
+
+    return normalize_team_name(get_short_team_name(name)) or normalize_team_name(name)
+
+
+class TeamRegistry:
+    """Map every name a team appears under to one stable team id
+
+    The id of a team is its normalized short name (see get_team_id),
+    e.g. 'fenerbahce'. Names are resolved with a dictionary lookup, and the
+    first time a new spelling is seen it is matched once against the known
+    teams and remembered as an alias. Names that do not belong to exactly
+    one team are collected in unmapped instead of guessing.
+    """
+
+    def __init__(self):
+        self.teams = {}
+        self.unmapped = set()
+        self._aliases = {}
+        self._tokens = {}
+
+    @classmethod
+    def from_club_table(cls, club_table):
+        """Build the registry of a season from its ClubTable"""
+
+        registry = cls()
+        for name in club_table.teams:
+            registry.add_team(name)
+
+        return registry
+
+    def add_team(self, name):
+        """Register a team under its full name
+
+        Args:
+            name: full name of the team
+
+        Returns:
+            The id of the team
+        """
+
+        team_id = get_team_id(name)
+        if self.teams.get(team_id, name) != name:
+            team_id = normalize_team_name(name)
+
+        self.teams[team_id] = name
+        self._aliases[normalize_team_name(name)] = team_id
+        self._aliases.setdefault(team_id, team_id)
+
+        # A token that belongs to more than one team can not identify either
+        for token in normalize_team_name(name).split():
+            if self._tokens.get(token, team_id) != team_id:
+                self._tokens[token] = None
+            else:
+                self._tokens[token] = team_id
+
+        return team_id
+
+    def lookup(self, name):
+        """Get the id of the team with the given name
+
+        Args:
+            name: any name of the team, e.g. from a fixture page
+
+        Returns:
+            The id of the team, or None if the name does not belong to
+            exactly one registered team
+        """
+
+        alias = normalize_team_name(name)
+        if alias in self._aliases:
+            return self._aliases[alias]
+
+        team_id = self._match(alias)
+        if team_id is None:
+            self.unmapped.add(name)
+            return None
+
+        self._aliases[alias] = team_id
+        return team_id
+
+    def _match(self, alias):
+        short_name = get_team_id(alias)
+        if short_name in self.teams:
+            return short_name
+
+        candidates = {self._tokens.get(token) for token in alias.split()}
+        candidates.discard(None)
+        if len(candidates) == 1:
+            return candidates.pop()
+
+        # Fall back to the old rule of the short name being part of the name,
+        # but only when a single team with a long enough id matches
+        candidates = [team_id for team_id in self.teams
+            if len(team_id) >= MIN_SUBSTRING_LENGTH and team_id in alias]
+        if len(candidates) == 1:
+            return candidates[0]
+
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_logo_index(logo_dir=LOGO_DIR):
+    """Index the club logos by their normalized file names
+
+    Args:
+        logo_dir: directory with the club logos
+
+    Returns:
+        A dictionary with the normalized file name and every token of it
+        that only one logo has as the key and the path of the logo as the value
+    """
+
+    index = {}
+    token_paths = {}
+
+    for filename in sorted(os.listdir(logo_dir)):
+        path = os.path.join(logo_dir, filename)
+        stem = normalize_team_name(filename.split('.')[0])
+        index[stem] = path
+        for token in stem.split():
+            token_paths.setdefault(token, set()).add(path)
+
+    for token, paths in token_paths.items():
+        if len(paths) == 1:
+            index.setdefault(token, paths.pop())
+
+    return index
+
+
+def get_logo_path(team_id, logo_dir=LOGO_DIR):
+    """Get the path of the logo of a team
+
+    Args:
+        team_id: id of the team from the TeamRegistry
+        logo_dir: directory with the club logos
+
+    Returns:
+        The path of the logo, or None if there is no logo for the team
+    """
+
+    # A logo is found by the whole id first and then by a word of it only
+    # one logo has, e.g. 'galatasaray a s' by galatasaray
+    index = get_logo_index(logo_dir)
+    for key in [team_id] + team_id.split():
+        if key in index:
+            return index[key]
+
+    return None
@@ -0,0 +1,42 @@
+import importlib
+import json
+import os
+
+import pytest
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    # The app loads its model when it is imported, a naive bayes model is
+    # trained into a temporary registry so the test is quick
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('MODEL_NAME', 'naive_bayes')
+        monkeypatch.setenv('MODEL_DIR', str(tmp_path_factory.mktemp('models')))
+        monkeypatch.setenv('TEAM_DATA', os.path.join(REPO_DIR, 'TeamData.csv'))
+        monkeypatch.setenv('CURRENT_SEASON_DATA', os.path.join(REPO_DIR, 'CurrentSeasonData.csv'))
+        app = importlib.import_module('app')
+
+    return app.app.test_client(), app.FEATURES
+
+
+def test_huge_integer_feature_is_a_bad_request(client):
+    client, features = client
+    body = '[' + ', '.join(['1' + '0' * 400] + ['0'] * (len(features) - 1)) + ']'
+
+    response = client.post('/predict', data=body, content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f"Feature {features[0]} is too large"
+
+
+def test_valid_features_are_predicted(client):
+    client, features = client
+
+    response = client.post('/predict', data=json.dumps([0] * len(features)),
+        content_type='application/json')
+
+    assert response.status_code == 200
+    assert response.get_json()['result'] in ('Draw', 'Home Win', 'Away Win')
@@ -0,0 +1,21 @@
+from model_registry import ModelRegistry
+from online import update_model
+from score_predictor import load_data
+
+
+def test_check_skips_a_model_that_was_just_refitted(tmp_path):
+    evidence, labels = load_data('TeamData.csv')
+    registry = ModelRegistry(tmp_path)
+    first, second, third = len(labels) - 90, len(labels) - 45, len(labels)
+
+    update_model('naive_bayes', evidence[:first], labels[:first], registry, check=True)
+
+    result = update_model('naive_bayes', evidence[:second], labels[:second], registry,
+        check=True)
+    assert result['mode'] == 'update'
+    assert result['drift']['rows'] == 0
+
+    result = update_model('naive_bayes', evidence[:third], labels[:third], registry,
+        check=True)
+    assert result['mode'] == 'update'
+    assert result['drift']['rows'] == third - second
@@ -0,0 +1,18 @@
+from team_registry import TeamRegistry, get_team_id
+
+
+def test_dotted_club_name_gets_an_id():
+    assert get_team_id('Galatasaray A.S.') == 'galatasaray a s'
+
+
+def test_dotted_club_name_does_not_match_other_clubs():
+    registry = TeamRegistry()
+    for name in ['Galatasaray A.S.', 'Sivasspor', 'Bursaspor', 'Çaykur Rizespor']:
+        registry.add_team(name)
+
+    assert registry.lookup('Galatasaray') == 'galatasaray a s'
+    assert registry.lookup('Sivasspor') == 'sivasspor'
+    assert registry.lookup('Bursaspor') == 'bursaspor'
+    assert registry.lookup('Rizespor') == 'rizespor'
+    assert registry.lookup('Kasimpasa') is None
+    assert registry.unmapped == {'Kasimpasa'}
@@ -0,0 +1,154 @@
+import argparse
+import os
+import time
+
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV
+
+from backtest import DEFAULT_CACHE_DIR, get_cached_folds, load_match_calendar
+from score_predictor import (MODEL_PARAMS, MODELS, load_data, load_model_params,
+    save_model_params)
+
+
+# The hyperparameters searched for every model, the names of the models
+# that are pipelines are prefixed with their step
+PARAM_SPACES = {
+    'logistic_regression': {
+        'logisticregression__C': loguniform(1e-3, 1e2),
+    },
+    'naive_bayes': {
+        'var_smoothing': loguniform(1e-12, 1e-3),
+    },
+    'k_nearest_neighbor': {
+        'pca__n_components': [None] + list(range(3, 16)),
+        'kneighborsclassifier__n_neighbors': randint(1, 100),
+        'kneighborsclassifier__weights': ['uniform', 'distance'],
+    },
+    'random_forest': {
+        'max_depth': randint(2, 20),
+        'min_samples_leaf': randint(1, 100),
+        'criterion': ['gini', 'entropy'],
+    },
+    'support_vector_machine': {
+        'svc__C': loguniform(1e-2, 1e2),
+        'svc__gamma': loguniform(1e-4, 1e0),
+    },
+    'gradient_boosting': {
+        'learning_rate': loguniform(1e-2, 3e-1),
+        'n_estimators': randint(50, 400),
+        'max_depth': randint(2, 6),
+        'subsample': uniform(0.5, 0.5),
+    },
+    'sgd_logistic_regression': {
+        'sgdclassifier__alpha': loguniform(1e-6, 1e-1),
+        'sgdclassifier__penalty': ['l2', 'l1', 'elasticnet'],
+    },
+}
+
+
+def tune_model(name, evidence, labels, folds, n_candidates=64, scoring='accuracy',
+               workers=None, seed=0):
+    """Search the hyperparameters of a model with successive halving
+
+    Every round the candidates are scored on the walk-forward folds with a
+    growing part of the training rows, and only the best third goes on to
+    the next round, so most candidates never see the full data.
+
+    Args:
+        name: name of the model in score_predictor.MODELS
+        evidence: 2D array of evidence
+        labels: array of labels
+        folds: the folds from backtest.get_walk_forward_folds
+        n_candidates: number of parameter sets tried in the first round
+        scoring: scikit-learn scoring used to rank the candidates
+        workers: number of candidates fitted at the same time, None uses
+            every core
+        seed: seed of the random candidates
+
+    Returns:
+        A dictionary with the model name, the best parameters, their score,
+        the number of candidates and rounds and the search time in seconds
+    """
+
+    cv = [(fold['train'], fold['test']) for fold in folds]
+
+    # The first round uses a ninth of the rows, with less than that the
+    # folds get too small for models like K-nearest neighbor
+    search = HalvingRandomSearchCV(clone(MODELS[name][1]), PARAM_SPACES[name],
+        n_candidates=n_candidates, cv=cv, scoring=scoring, factor=3,
+        min_resources=len(labels) // 9, random_state=seed,
+        n_jobs=workers if workers is not None else -1)
+
+    start = time.perf_counter()
+    search.fit(evidence, labels)
+
+    return {
+        'model': name,
+        'params': {param: getattr(value, 'item', lambda: value)()
+            for param, value in search.best_params_.items()},
+        'score': float(search.best_score_),
+        'candidates': int(sum(search.n_candidates_)),
+        'rounds': int(search.n_iterations_),
+        'time': time.perf_counter() - start,
+    }
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the tuning
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Tune the hyperparameters of the match result models")
+    parser.add_argument("--data", default="TeamData.csv",
+        help="csv file with the webscraped data")
+    parser.add_argument("--models", nargs="+", choices=list(PARAM_SPACES),
+        default=list(PARAM_SPACES), help="models to tune, defaults to every model")
+    parser.add_argument("--candidates", type=int, default=64,
+        help="number of parameter sets tried in the first round")
+    parser.add_argument("--folds", type=int, default=5,
+        help="number of the latest seasons the candidates are scored on")
+    parser.add_argument("--scoring", default="accuracy",
+        help="scikit-learn scoring used to rank the candidates")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+        help="number of candidates fitted at the same time")
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the random candidates")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+        help="directory the backtest folds are cached in")
+    parser.add_argument("--output", default=MODEL_PARAMS,
+        help="json file the best parameters are written to, score_predictor trains with it")
+    parser.add_argument("--extra-features", action="store_true",
+        help="also use the Elo ratings and the form features")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    evidence, labels = load_data(args.data, args.extra_features)
+    seasons, matchdays = load_match_calendar(args.data)
+    folds = get_cached_folds(seasons, matchdays, cache_dir=args.cache_dir)[-args.folds:]
+
+    model_params = load_model_params(args.output)
+    for name in args.models:
+        result = tune_model(name, evidence, labels, folds, args.candidates,
+            args.scoring, args.workers, args.seed)
+        print(f"{MODELS[name][0]}: {args.scoring} {result['score']:.3f} with "
+            f"{result['params']} ({result['candidates']} candidates in {result['rounds']} "
+            f"rounds, {result['time']:.1f}s)")
+
+        # Written after every model so an interrupted run keeps what it found
+        model_params[name] = result['params']
+        save_model_params(model_params, args.output)
+
+
+if __name__ == "__main__":
+    main()
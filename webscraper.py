@@ -1,18 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas
-import re
-
-
-def get_fixture_list(soup):
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dataset import (DEFAULT_BUFFER_ROWS, STANDINGS_FEATURE_COLUMNS,
+    TEAM_DATA_COLUMNS, CsvAppender, FixtureRow, get_scraped_matchdays)
+from fetch_planner import (CLUB_TABLE, fetch_planned_pages,
+    get_season_matchdays, plan_season_pages)
+from fetcher import DEFAULT_DELAY, DEFAULT_PER_HOST, DEFAULT_WORKERS, PageFetcher
+from page_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE, PageCache
+from page_model import ClubTable, MatchdayPage, get_short_team_name
+from page_parser import (CLUB_TABLE_REGION, FIXTURES_REGION,
+    get_default_parser, parse_page)
+from run_report import RunReport
+from standings import get_season_results, get_standings_features
+from team_registry import TeamRegistry
+
+
+def get_fixture_list(page):
     """Get the list of every fixture in given week
 
     This function returns the name of the home and away team
     for the games being played in a given week.
 
     Args:
-        soup: The parsed HTML data that we got from BeautifulSoup 
-        on the link for the given week's fixture page on transfermarkt
+        page: The MatchdayPage of the given week's fixture page on
+        transfermarkt, or the parsed HTML data that we got from BeautifulSoup
 
     Returns:
         The first list inclduing the name of all of the home teams
@@ -20,34 +32,9 @@ def get_fixture_list(soup):
         the same week
     """
 
-    fixture_list = []
-    all = soup.find_all("div", {"class": "responsive-table"})
-
-    # Get the list of home teams for given week
-    home_games = all[0].find_all("td", 
-        {"class": "text-right no-border-rechts no-border-links hauptlink hide-for-small"})
-    home_team_list = []
-    for index, _ in enumerate(home_games):
-        home_game = home_games[index].find_all("a", 
-            attrs={'class': "vereinprofil_tooltip"})
-        for tag in home_game:
-            home_team_list.append(tag.text.strip())
-
-    # Get the list of away teams for given week
-    away_games = all[0].find_all("td", 
-        {"class": "no-border-links no-border-rechts hauptlink hide-for-small"})
-    away_team_list = []
-    for index, _ in enumerate(away_games):
-        away_game = away_games[index].find_all("a", 
-            attrs={"vereinprofil_tooltip"})
-        for tag in away_game:
-            away_team_list.append(tag.text.strip())
-
-    # Combine the team names in a string
-    for home, away in zip(home_team_list, away_team_list):
-        fixture_list.append(f"{home} vs. {away}")
+    page = get_matchday_page(page)
 
-    return home_team_list, away_team_list
+    return list(page.home_teams), list(page.away_teams)
 
 
 def get_fixture_text(home_team_list, away_team_list):
@@ -70,417 +57,441 @@ def get_fixture_text(home_team_list, away_team_list):
     return fixture_list
 
 
-def get_league_position(soup):
-    """Get the league position of each team in the current week
+def get_club_data(table):
+    """Get the club data of each team
+
+    This function returns the name of each team in the current season
+    and returns a dictionary with their squad size, average age, number
+    of foreigners, average market value, and the total market 
+    value (in thousands)
 
     Args:
-        soup: The parsed HTML data that we got from BeautifulSoup 
-        on the link for the given week's fixture page on transfermarkt
+        table: The ClubTable of the given season's club table page on
+        transfermarkt, or the parsed HTML data that we got from BeautifulSoup
 
     Returns:
-        The first list inclduing the league position of all of the home teams
-        for the current week and the league position of all the away teams for
-        the same week
+        A dictionary that has the team name as the key and a list of all
+        the information listed above as the value
     """
 
-    home_positions = []
-    away_positions = []
-    position_list = []
-    all = soup.find_all("div", {"class": "responsive-table"})
-    league_positions = all[0].find_all("span", {"class": "tabellenplatz"})
-
-    # Gather league positions from the site
-    for index, _ in enumerate(league_positions):
-        pos = league_positions[index]
-        pos_num = int(''.join(x for x in pos.text.strip() if x.isdigit()))
-        position_list.append(pos_num)
-        
-    # Clean the position list
-    league_position_list = []
-    [league_position_list.append(x) \
-        for x in position_list if x not in league_position_list]
+    if not isinstance(table, ClubTable):
+        table = ClubTable.from_soup(table)
 
-    # Divide the home team positions and the away team positions
-    home_positions = league_position_list[::2]
-    away_positions = league_position_list[1::2]
+    return {get_short_team_name(name): list(info)
+        for name, info in table.teams.items()}
 
-    return home_positions, away_positions
 
+def get_match_results(page):
+    """Get the match results of each fixture in the current week
 
-def get_score_information(soup):
-    """Get the score information of each team in the current week
+    This functions returns the result of each fixture: 
+        0 if the game ends in a draw
+        1 if the home team wins the game and away team loses
+        2 if the away team wins the game and home team loses
+
+    Args:
+        page: The MatchdayPage of the given week's fixture page on
+        transfermarkt, or the parsed HTML data that we got from BeautifulSoup
+
+    Returns:
+        A list with the result of each game based on the numbering
+        mentioned above, None for the games that were not played
+    """
 
-    This function returns the name of each team playing in the current
-    week and their current number of wins, draws, losses, goals scored,
-    goals conceded, goal average, and their current points. 
+    page = get_matchday_page(page)
+
+    return list(page.fixture_results)
+
+
+def get_matchday_page(page):
+    """Walk a fixture page into a MatchdayPage unless that already happened
 
     Args:
-        soup: The parsed HTML data that we got from BeautifulSoup 
-        on the link for the given week's fixture page on transfermarkt
+        page: a MatchdayPage or the parsed HTML data of a fixture page
 
     Returns:
-        A dictionary that has the team name as the key and a list of all
-        the information listed above as the value
+        The MatchdayPage of the fixture page
     """
 
-    table_information = {}
-    all = soup.find_all("table")
-    table = all[4].find_all("tr")
-    table = table[1:]
-
-    # Iterate over all the teams in the league standings table
-    for index, _ in enumerate(table):
-        score_list = []
-        team_name = table[index].find_all("td", 
-            {"class": "no-border-links hauptlink"})
-        team_name = team_name[0].find_all("a", 
-            {"class": "vereinprofil_tooltip"})
-
-        # Since the websites stores different names on the board and fixture
-        # list we trim down the name of the team to only include the main name
-        name = team_name[0].text.strip()
-        name = name.split('.')[-1].strip()
-        name = name.split(' ')
-        if len(name) > 1:
-            if len(name[0]) > len(name[1]):
-                name = name[0]
-            else:
-                name = name[1]
-        else:
-            name = name[0]
-    #     print(f"Name: {name}")
+    if isinstance(page, MatchdayPage):
+        return page
 
-        score_info = table[index].find_all("td", {"class": "zentriert"})[2:]
-        for index, _ in enumerate(score_info):
-            if score_info[index].text.strip() == '-':
-                score_list.append(0)
-            else:
-                score_list.append(score_info[index].text.strip())
+    return MatchdayPage.from_soup(page)
 
-        table_information[name] = score_list
 
-    return table_information
+def build_matchday_rows(season, matchday, page, standings, club_data, registry):
+    """Build the rows of the dataset for every fixture in a matchday
 
+    Args:
+        season: starting year of the season
+        matchday: number of the matchday in the season
+        page: the MatchdayPage of the matchday
+        standings: list with the values of the STANDINGS_FEATURE_COLUMNS of
+            every fixture
+        club_data: dictionary with the team id as the key and the club data
+            of the team as the value
+        registry: the TeamRegistry of the season
 
-def get_club_data(soup):
-    """Get the club data of each team
+    Returns:
+        A list with a FixtureRow for every fixture in the matchday, fixtures
+        with a team that is not in the registry are left out
+    """
+
+    rows = []
+    home_team_list, away_team_list = get_fixture_list(page)
+    fixture_list = get_fixture_text(home_team_list, away_team_list)
+    result_list = get_match_results(page)
+    season_name = f"{str(season)[2:]}/{str(season+1)[2:]}"
+
+    for index, fixture in enumerate(fixture_list):
+        home_team_id = registry.lookup(home_team_list[index])
+        away_team_id = registry.lookup(away_team_list[index])
+        if home_team_id not in club_data or away_team_id not in club_data:
+            continue
+
+        # The Home and Away value of every club table column are next to
+        # each other in a row
+        club_values = [value for values in zip(club_data[home_team_id],
+            club_data[away_team_id]) for value in values]
+
+        # Fixtures that have not been played yet do not have a result
+        rows.append(FixtureRow(matchday, f"{season_name} - {fixture}",
+            *standings[index], *club_values, result_list[index]))
+
+    return rows
 
-    This function returns the name of each team in the current season
-    and returns a dictionary with their squad size, average age, number
-    of foreigners, average market value, and the total market 
-    value (in thousands)
+
+def is_matchday_played(page, next_page=None):
+    """Check if every fixture of a matchday has been played
+
+    A matchday with a postponed fixture still counts as played once the
+    next matchday has started, otherwise it would block every later one.
 
     Args:
-        soup: The parsed HTML data that we got from BeautifulSoup 
-        on the link for the given season's club table page on transfermarkt
+        page: the MatchdayPage of the matchday
+        next_page: the MatchdayPage of the next matchday, or None to only
+            count the matchday as played when every fixture has a result
 
     Returns:
-        A dictionary that has the team name as the key and a list of all
-        the information listed above as the value
+        True if the matchday can be added to the historical data
     """
 
-    all = soup.find_all("table", {"class": "items"})
-    table_all = all[0].find_all("tbody")
-    teams = table_all[0].find_all("td", {"class": "hauptlink no-border-links show-for-small show-for-pad"})
-
-    # Get the names of all the teams and add to dictionary
-    team_names = {}
-    for index, _ in enumerate(teams):
-        name = teams[index].text.strip()
-        name = name.split('.')
-        name = name[-1].strip()
-        name = name.split(' ')
-        if len(name) > 1:
-            if len(name[0]) > len(name[1]):
-                name = name[0]
-            else:
-                name = name[1]
-        else:
-            name = name[0]
-        team_names[name.strip()] = []
-
-    team_info_list = []
-    odd_team_info = []
-    even_team_info = []
-    odd_teams = table_all[0].find_all("tr", {"class": "odd"})
-    even_teams = table_all[0].find_all("tr", {"class": "even"})
-
-    # Get the squad size, average age, and number of foreigners for each club
-    for index, _ in enumerate(odd_teams):
-        curr_team = odd_teams[index]
-
-        # Get squad size, average age, and number of foreigners
-        squad_info = odd_teams[index].find_all("td", {"class": "zentriert"})
-        tmp_list = []
-        tmp_list.append(int(squad_info[1].text.strip())) # Squad Size
-        tmp_list.append(float(squad_info[2].text.strip())) # Average Age
-        tmp_list.append(int(squad_info[3].text.strip())) # Number of Foreigners
-        odd_team_info.append(tmp_list)
-
-    for index, _ in enumerate(even_teams):
-        curr_team = even_teams[index]
-
-        # Get squad size, average age, and number of foreigners
-        squad_info = even_teams[index].find_all("td", {"class": "zentriert"})
-        tmp_list = []
-        tmp_list.append(int(squad_info[1].text.strip())) # Squad Size
-        tmp_list.append(float(squad_info[2].text.strip())) # Average Age
-        tmp_list.append(int(squad_info[3].text.strip())) # Number of Foreigners
-        even_team_info.append(tmp_list)
-
-    for odd, even in zip(odd_team_info, even_team_info):
-        team_info_list.append(odd)
-        team_info_list.append(even)
-
-    if len(odd_team_info) > len(even_team_info):
-        team_info_list.append(odd_team_info[-1])
-
-    market_values = table_all[0].find_all("td", {"class": "rechts hide-for-small hide-for-pad"})
-    avg_market_val_list = market_values[::2]
-    total_market_val_list = market_values[1::2]
-    market_val_list = []
-
-    # Get the average and total market value for each team
-    index = 0
-    for avg, total in zip(avg_market_val_list, total_market_val_list):
-        avg_million = False
-        total_million = False
-        if 'm' in avg.text:
-            avg_million = True
-        if 'm' in total.text:
-            total_million = True
-
-        if avg_million:
-            avg_num = round(float(re.findall("\d+\.\d+", avg.text)[0])*1000)
-        else:
-            avg_num = round(float(re.findall(r'\d+', avg.text)[0]))
+    if not page.home_teams:
+        return False
+    if len(page.results) == len(page.home_teams):
+        return True
 
-        if total_million:
-            total_num = round(float(re.findall("\d+\.\d+", total.text)[0])*1000)
-        else:
-            total_num = round(float(re.findall(r'\d+', avg.text)[0]))
+    return next_page is not None and len(next_page.results) > 0
 
-        team_info_list[index].append(avg_num)
-        team_info_list[index].append(total_num)
-        index += 1
 
-    index = 0
-    for key in team_names:
-        team_names[key] = team_info_list[index]
-        index += 1
+def scrape_matchdays(season, matchdays, pages, parser=None, report=None):
+    """Scrape the given matchdays of a season in order
 
-    return team_names
+    Args:
+        season: starting year of the season
+        matchdays: the matchdays we want to scrape in the season
+        pages: the pages of the season from fetch_planned_pages
+        parser: name of the BeautifulSoup parser backend
+        report: the RunReport the time of every stage is added to
+
+    Yields:
+        The matchday, its MatchdayPage and the rows for its fixtures
+    """
 
+    report = report or RunReport()
+
+    with report.stage('fetch_wait'):
+        content = pages[CLUB_TABLE].result()
+    with report.stage('parse'):
+        club_soup = parse_page(content, CLUB_TABLE_REGION, parser)
+    with report.stage('extract'):
+        club_table = ClubTable.from_soup(club_soup)
+        registry = TeamRegistry.from_club_table(club_table)
+        club_data = {registry.lookup(name): list(info)
+            for name, info in club_table.teams.items()}
+
+    matchday_pages = {}
+    for matchday in sorted(key for key in pages if key != CLUB_TABLE):
+        with report.stage('fetch_wait'):
+            content = pages[matchday].result()
+        with report.stage('parse'):
+            soup = parse_page(content, FIXTURES_REGION, parser)
+        with report.stage('extract'):
+            matchday_pages[matchday] = MatchdayPage.from_soup(soup)
+
+    # The standings before every matchday are built from the results of
+    # the season instead of being scraped from the previous matchday
+    with report.stage('standings'):
+        standings = get_standings_features(get_season_results(matchday_pages))
+        matchday_standings = {matchday: list(group[STANDINGS_FEATURE_COLUMNS].itertuples(
+            index=False, name=None)) for matchday, group in standings.groupby('Matchday')}
+
+    for matchday in matchdays:
+        page = matchday_pages[matchday]
+        with report.stage('rows'):
+            rows = build_matchday_rows(season, matchday, page,
+                matchday_standings.get(matchday, []), club_data, registry)
+
+        if registry.unmapped:
+            print(f"Skipped fixtures of Season {season}/{season+1} Matchday "
+                f"{matchday} with unknown teams: {', '.join(sorted(registry.unmapped))}")
+            registry.unmapped.clear()
+
+        yield matchday, page, rows
+
+
+def scrape_in_order(season_plans, writer, fetcher, parser=None, report=None):
+    """Scrape the planned seasons one after another in this process
 
-def get_match_results(soup):
-    """Get the match results of each fixture in the current week
+    Args:
+        season_plans: list with a (season, matchdays) tuple for every season
+        writer: the CsvAppender the rows are written to
+        fetcher: the PageFetcher the pages are downloaded with
+        parser: name of the BeautifulSoup parser backend
+        report: the RunReport the stages and progress of the run go to
+    """
 
-    This functions returns the result of each fixture: 
-        0 if the game ends in a draw
-        1 if the home team wins the game and away team loses
-        2 if the away team wins the game and home team loses
+    report = report or RunReport()
+    total = sum(len(matchdays) for _, matchdays in season_plans)
+
+    # Keep the downloads one season ahead of the season being processed
+    if season_plans:
+        next_pages = fetch_planned_pages(
+            plan_season_pages(*season_plans[0]), fetcher, season_plans[0][1])
+
+    for plan_index, (season, matchdays) in enumerate(season_plans):
+        print(f"\nAdding Data for Season {season}/{season+1}\n")
+
+        start = time.perf_counter()
+        season_rows = 0
+
+        pages = next_pages
+        if plan_index + 1 < len(season_plans):
+            next_season, next_matchdays = season_plans[plan_index + 1]
+            next_pages = fetch_planned_pages(plan_season_pages(
+                next_season, next_matchdays), fetcher, next_matchdays)
+
+        for matchday, page, rows in scrape_matchdays(season, matchdays, pages, parser, report):
+            season_rows += write_matchday(writer, season, matchday, is_matchday_played(page),
+                rows, report, total)
+
+        report.add_season(season, len(matchdays), season_rows, time.perf_counter() - start)
+
+
+def write_matchday(writer, season, matchday, played, rows, report, total):
+    """Write the rows of a matchday and count them in the run report
+
+    A matchday with a fixture that has not been played is not written, so
+    it is not counted as scraped and --incremental scrapes it again.
 
     Args:
-        soup: The parsed HTML data that we got from BeautifulSoup 
-        on the link for the given week's fixture page on transfermarkt
+        writer: the CsvAppender the rows are written to
+        season: starting year of the season
+        matchday: number of the matchday in the season
+        played: whether every fixture of the matchday has been played
+        rows: the rows of the matchday
+        report: the RunReport of the run
+        total: number of matchdays in the run, for the progress line
 
     Returns:
-        A list with the result of each game based on the numbering
-        mentioned above
+        The number of rows that were written
     """
-    
-    result_list = []
-    all = soup.find_all("div", {"class": "responsive-table"})
-    match_results = all[0].find_all("span", {"class": "matchresult finished"})
-
-    # Gather the match scores from the site
-    for index, _ in enumerate(match_results):
-        result = match_results[index]
-        result_text = result.text.strip()
-        home_result, away_result = result_text.split(':')
-        home_result = int(home_result)
-        away_result = int(away_result)
-        
-        # If home result is equal to the away result we categorize the game 
-        # as a draw or 0. If home result is greater than the away result we 
-        # categorize the game as a win or 1. If home result is less than the 
-        # away result we categorize the game as a loss or 2
-        if home_result == away_result:
-            result_list.append(0)
-        elif home_result > away_result:
-            result_list.append(1)
-        else:
-            result_list.append(2)
 
-    return result_list
+    if played:
+        with report.stage('write'):
+            writer.append(rows)
+        report.increment('rows', len(rows))
+    report.increment('matchdays')
+    report.log_progress(report.counters['matchdays'], total)
 
+    if not played:
+        print(f"Skipped Season {season}/{season+1} Matchday {matchday}, "
+            f"not every fixture has been played")
+        return 0
 
-def clean_score_list(score_list):
-    """Clean up the list with score information
+    print(f"Successfully Added Season {season}/{season+1} Matchday {matchday}")
+    return len(rows)
 
-    This function converts all the values from score list that we
-    got from the get_score_information function into an integer
+
+def scrape_in_processes(season_plans, writer, args, report=None):
+    """Scrape the planned seasons in parallel in a pool of worker processes
+
+    The seasons are independent so every worker scrapes whole seasons, and
+    the results are written in the order of the plans so the output has
+    the same row order as a run in a single process.
 
     Args:
-        score_list: score_list that the get_score_information function returned
+        season_plans: list with a (season, matchdays) tuple for every season
+        writer: the CsvAppender the rows are written to
+        args: the parsed command line options
+        report: the RunReport the stages of the workers are merged into
+    """
+
+    report = report or RunReport()
+    total = sum(len(matchdays) for _, matchdays in season_plans)
+    seasons = [season for season, _ in season_plans]
+    matchdays = [matchdays for _, matchdays in season_plans]
+
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        season_results = pool.map(scrape_season, seasons, matchdays,
+            [args] * len(season_plans))
+
+        for season, (matchday_rows, season_report) in zip(seasons, season_results):
+            report.merge(season_report)
+            print(f"\nAdding Data for Season {season}/{season+1}\n")
+            for matchday, played, rows in matchday_rows:
+                write_matchday(writer, season, matchday, played, rows, report, total)
+
+
+def scrape_season(season, matchdays, args):
+    """Scrape the given matchdays of a season in a worker process
+
+    Every worker downloads through its own PageFetcher, so the politeness
+    budget of the command line options is divided between the workers.
+
+    Args:
+        season: starting year of the season
+        matchdays: the matchdays we want to scrape in the season
+        args: the parsed command line options
 
     Returns:
-        The same list as the score_list but all the values are converted to int
+        A list with a (matchday, played, rows) tuple for every scraped
+        matchday, played is whether all of its fixtures were played, and
+        the RunReport of the worker as a dictionary
     """
 
-    table_information = []
+    worker_args = argparse.Namespace(**vars(args))
+    worker_args.workers = max(1, args.workers // args.processes)
+    worker_args.per_host = args.per_host // args.processes
+    worker_args.delay = args.delay * args.processes
+
+    start = time.perf_counter()
+    report = RunReport()
+    with make_fetcher(worker_args, report) as fetcher:
+        pages = fetch_planned_pages(plan_season_pages(season, matchdays),
+            fetcher, matchdays)
+        matchday_rows = [(matchday, is_matchday_played(page), rows) for matchday, page, rows
+            in scrape_matchdays(season, matchdays, pages, args.parser, report)]
 
-    table_information.append(int(score_list[0])) # NumWins
-    table_information.append(int(score_list[1])) # NumDraws
-    table_information.append(int(score_list[2])) # NumLosses
+    report.add_season(season, len(matchdays), sum(len(rows) for _, _, rows in matchday_rows),
+        time.perf_counter() - start)
 
-    if isinstance(score_list[3], str):
-        goals = score_list[3].split(':')
-        table_information.append(int(goals[0])) # GoalsScored
-        table_information.append(int(goals[1])) #GoalsConceded
-    else:
-        table_information.append(0) # GoalsScored
-        table_information.append(0) #GoalsConceded
+    return (matchday_rows, report.to_dict())
 
-    table_information.append(int(score_list[4])) # GoalAvg
-    table_information.append(int(score_list[5])) # Points
 
-    return table_information
+def add_fetch_arguments(parser, max_age=DEFAULT_MAX_AGE):
+    """Add the command line options for downloading and parsing pages
 
+    Args:
+        parser: the argparse.ArgumentParser of the script
+        max_age: default number of seconds a cached page is used for
+    """
 
-def main():
-    fixture_data = []
-    fixture_url = 'https://www.transfermarkt.com/super-lig/spieltagtabelle/wettbewerb/TR1?saison_id='
-    club_table_url = 'https://www.transfermarkt.com/super-lig/startseite/wettbewerb/TR1/saison_id/'
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+        help="directory the downloaded pages are cached in")
+    parser.add_argument("--max-age", type=float, default=max_age,
+        help="seconds a cached page is used before it is revalidated")
+    parser.add_argument("--offline", action="store_true",
+        help="only use cached pages and never touch the network")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+        help="number of pages downloaded at the same time")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+        help="number of requests allowed in flight per host")
+    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY,
+        help="minimum seconds between two requests to the same host")
+    parser.add_argument("--parser", default=get_default_parser(),
+        choices=["lxml", "html.parser", "html5lib"],
+        help="BeautifulSoup parser backend used for the pages")
+
+
+def make_fetcher(args, report=None):
+    """Create the PageFetcher described by the command line options
 
-    for season in range(2005, 2021):
-        print(f"\nAdding Data for Season {season}/{season+1}\n")
-        upper_matchday = 35
-        if season == 2020:
-            upper_matchday = 43
-
-        for matchday in range(1, upper_matchday):
-            season_requests = requests.get(
-                fixture_url + str(season) + '&spieltag=' + str(matchday), 
-                headers={'User-agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:61.0) Gecko/20100101 Firefox/61.0'})
-            prev_season_requests = requests.get(
-                fixture_url + str(season) + '&spieltag=' + str(matchday-1), 
-                headers={'User-agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:61.0) Gecko/20100101 Firefox/61.0'})
-            clubs_requests = requests.get(
-                club_table_url + str(season), 
-                headers={'User-agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:61.0) Gecko/20100101 Firefox/61.0'})
-            
-            content = season_requests.content
-            soup = BeautifulSoup(content, 'html.parser')
-
-            prev_content = prev_season_requests.content
-            prev_soup = BeautifulSoup(prev_content, 'html.parser')
-
-            club_content = clubs_requests.content
-            club_soup = BeautifulSoup(club_content, 'html.parser')
-
-            home_team_list, away_team_list = get_fixture_list(soup)
-            fixture_list = get_fixture_text(home_team_list, away_team_list)
-            home_positions, away_positions = get_league_position(soup)
-            result_list = get_match_results(soup)
-            club_data = get_club_data(club_soup)
-
-            score_info = {}
-            if matchday != 1:
-                score_info = get_score_information(prev_soup)
-
-            for index, _ in enumerate(fixture_list):
-                tmp_dictionary = {}
-
-                # Add the match day to the dictionary
-                tmp_dictionary['Matchday'] = matchday
-                
-                # Add the matches to the dictionary
-                m = f"{str(season)[2:]}/{str(season+1)[2:]} - {fixture_list[index]}"
-                tmp_dictionary['Matches'] = m
-
-                # Add the home and away positions to the dictionary
-                # For the first week set league position values to 0
-                if matchday == 1:
-                    tmp_dictionary['HomePositions'] = 0
-                    tmp_dictionary['AwayPositions'] = 0
-                    tmp_dictionary['HomeWins'] = 0
-                    tmp_dictionary['AwayWins'] = 0
-                    tmp_dictionary['HomeDraws'] = 0
-                    tmp_dictionary['AwayDraws'] = 0
-                    tmp_dictionary['HomeLosses'] = 0
-                    tmp_dictionary['AwayLosses'] = 0
-                    tmp_dictionary['HomeGoalsScored'] = 0
-                    tmp_dictionary['AwayGoalsScored'] = 0
-                    tmp_dictionary['HomeGoalsConceded'] = 0
-                    tmp_dictionary['AwayGoalsConceded'] = 0
-                    tmp_dictionary['HomeGoalDiff'] = 0
-                    tmp_dictionary['AwayGoalDiff'] = 0
-                    tmp_dictionary['HomePoints'] = 0
-                    tmp_dictionary['AwayPoints'] = 0
-                else:
-                    home_team_name = home_team_list[index]
-                    away_team_name = away_team_list[index]
-                    home_score_list = []
-                    away_score_list = []
-                    for key in score_info:
-                        if key in home_team_name:
-                            home_score_list = clean_score_list(score_info[key])
-                        if key in away_team_name:
-                            away_score_list = clean_score_list(score_info[key])
-
-                    tmp_dictionary['HomePositions'] = home_positions[index]
-                    tmp_dictionary['AwayPositions'] = away_positions[index]
-                    tmp_dictionary['HomeWins'] = home_score_list[0]
-                    tmp_dictionary['AwayWins'] = away_score_list[0]
-                    tmp_dictionary['HomeDraws'] = home_score_list[1]
-                    tmp_dictionary['AwayDraws'] = away_score_list[1]
-                    tmp_dictionary['HomeLosses'] = home_score_list[2]
-                    tmp_dictionary['AwayLosses'] = away_score_list[2]
-                    tmp_dictionary['HomeGoalsScored'] = home_score_list[3]
-                    tmp_dictionary['AwayGoalsScored'] = away_score_list[3]
-                    tmp_dictionary['HomeGoalsConceded'] = home_score_list[4]
-                    tmp_dictionary['AwayGoalsConceded'] = away_score_list[4]
-                    tmp_dictionary['HomeGoalDiff'] = home_score_list[5]
-                    tmp_dictionary['AwayGoalDiff'] = away_score_list[5]
-                    tmp_dictionary['HomePoints'] = home_score_list[6]
-                    tmp_dictionary['AwayPoints'] = away_score_list[6]
-
-                # Add the club table information to the dictionary
-                home_team_name = home_team_list[index]
-                away_team_name = away_team_list[index]
-                home_table_list = []
-                away_table_list = []
-                for key in club_data:
-                    if key in home_team_name:
-                        home_table_list = club_data[key]
-                    if key in away_team_name:
-                        away_table_list = club_data[key]
-
-                tmp_dictionary['HomeSquadSize'] = home_table_list[0]
-                tmp_dictionary['AwaySquadSize'] = away_table_list[0]
-                tmp_dictionary['HomeAvgAge'] = home_table_list[1]
-                tmp_dictionary['AwayAvgAge'] = away_table_list[1]
-                tmp_dictionary['HomeNumForeigners'] = home_table_list[2]
-                tmp_dictionary['AwayNumForeigners'] = away_table_list[2]
-                tmp_dictionary['HomeAvgMarketVal'] = home_table_list[3]
-                tmp_dictionary['AwayAvgMarketVal'] = away_table_list[3]
-                tmp_dictionary['HomeMarketVal'] = home_table_list[4]
-                tmp_dictionary['AwayMarketVal'] = away_table_list[4]
-                
-                # Add the match scores to the dictionary
-                if len(result_list) < 9 and index == 8:
-                    tmp_dictionary['Result'] = 0
-                else:
-                    tmp_dictionary['Result'] = result_list[index]
-
-                fixture_data.append(tmp_dictionary)
-
-            print(f"Successfully Added Season {season}/{season+1} Matchday {matchday}")
-
-    # Convert the data into a csv file
-    df = pandas.DataFrame(fixture_data)
-    df.to_csv("TeamData.csv")
+    Args:
+        args: the parsed command line options
+        report: optional RunReport the fetch and download stages go to
+    """
+
+    cache = PageCache(args.cache_dir, max_age=args.max_age, offline=args.offline)
+
+    return PageFetcher(cache, max_workers=args.workers,
+        per_host=args.per_host, delay=args.delay, report=report)
+
+
+def parse_args(argv=None):
+    """Parse the command line options of the webscraper
+
+    Args:
+        argv: list of command line arguments, defaults to sys.argv
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description="Scrape the Super Lig data")
+    parser.add_argument("--output", default="TeamData.csv",
+        help="csv file the scraped data is written to")
+    parser.add_argument("--first-season", type=int, default=2005,
+        help="starting year of the first season to scrape")
+    parser.add_argument("--last-season", type=int, default=2020,
+        help="starting year of the last season to scrape")
+    parser.add_argument("--incremental", action="store_true",
+        help="keep the existing output and only add the missing matchdays")
+    parser.add_argument("--processes", type=int, default=1,
+        help="number of seasons scraped at the same time in worker processes")
+    parser.add_argument("--columnar", action="store_true",
+        help="also write the evidence and labels as memory-mappable .npy files")
+    parser.add_argument("--buffer-rows", type=int, default=DEFAULT_BUFFER_ROWS,
+        help="number of rows buffered before they are written to the output")
+    parser.add_argument("--report",
+        help="json file the time and memory of every stage of the run is written to")
+    parser.add_argument("--progress", action="store_true",
+        help="print the live timings and memory after every matchday")
+    add_fetch_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    # Every worker process needs at least one request of the per host budget
+    if args.processes > args.per_host:
+        parser.error(f"--processes {args.processes} is more than --per-host "
+            f"{args.per_host}, every process needs a request of the per host budget")
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Matchdays are streamed to the output in small blocks as they are
+    # scraped, so an interrupted run can be finished later with --incremental
+    writer = CsvAppender(args.output, TEAM_DATA_COLUMNS,
+        overwrite=not args.incremental, buffer_rows=args.buffer_rows,
+        columnar=args.columnar)
+    scraped = set()
+    if args.incremental:
+        scraped = get_scraped_matchdays(args.output)
+
+    season_plans = []
+    for season in range(args.first_season, args.last_season + 1):
+        matchdays = [matchday for matchday in get_season_matchdays(season)
+            if (season, matchday) not in scraped]
+        if matchdays:
+            season_plans.append((season, matchdays))
+
+    report = RunReport(show_progress=args.progress)
+    try:
+        if args.processes > 1:
+            scrape_in_processes(season_plans, writer, args, report)
+        else:
+            with make_fetcher(args, report) as fetcher:
+                scrape_in_order(season_plans, writer, fetcher, args.parser, report)
+    finally:
+        # Whatever was scraped before an error still reaches the output
+        with report.stage('close'):
+            writer.close()
+
+    if args.report:
+        report.write(args.report)
         
 
 if __name__ == "__main__":